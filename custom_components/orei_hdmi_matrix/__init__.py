@@ -1,3 +1,46 @@
-from .orei_hdmi_matrix import HDMIMatrixAPI
+"""The OREI HDMI Matrix integration."""
 
-api = HDMIMatrixAPI()
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .const import DATA_HDMIMATRIX_COORDINATOR
+from .orei_hdmi_matrix import AsyncHDMIMatrixAPI, HDMIMatrixFleet
+
+# Home Assistant is only needed for type checking here, so the library and
+# its tests can be imported without it.
+if TYPE_CHECKING:
+    from homeassistant.config_entries import ConfigEntry
+    from homeassistant.core import HomeAssistant
+
+PLATFORMS = ["media_player", "binary_sensor", "select", "sensor", "switch"]
+
+async_api = AsyncHDMIMatrixAPI()
+fleet = HDMIMatrixFleet(async_api)
+
+
+async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up a matrix from a config entry."""
+    # The zones set up the coordinator the port entities read from.
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS[:1])
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS[1:])
+    return True
+
+
+async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Unload a config entry and stop polling its matrix."""
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+    coordinator = entry.runtime_data
+    hass.data[DATA_HDMIMATRIX_COORDINATOR].pop(coordinator.host, None)
+    await coordinator.async_shutdown()
+    return True
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored state of a deleted matrix."""
+    from homeassistant.const import CONF_HOST
+
+    from .coordinator import async_remove_snapshot
+
+    await async_remove_snapshot(hass, entry.data[CONF_HOST])
@@ -0,0 +1,81 @@
+"""Connection and signal status of the ports of an OREI HDMI Matrix."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+    BinarySensorEntityDescription,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .entity import (
+    HDMIMatrixPortEntity,
+    HDMIMatrixPortEntityDescription,
+    async_add_port_entities,
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HDMIMatrixBinarySensorEntityDescription(
+    BinarySensorEntityDescription, HDMIMatrixPortEntityDescription
+):
+    """Describes a port status binary sensor."""
+
+
+BINARY_SENSORS: tuple[HDMIMatrixBinarySensorEntityDescription, ...] = (
+    HDMIMatrixBinarySensorEntityDescription(
+        key="connected",
+        name="Connected",
+        device_class=BinarySensorDeviceClass.CONNECTIVITY,
+        value_fn=lambda output: output.connected,
+    ),
+    HDMIMatrixBinarySensorEntityDescription(
+        key="hdbt_connected",
+        name="HDBaseT connected",
+        device_class=BinarySensorDeviceClass.CONNECTIVITY,
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda output: output.hdbt_connected,
+    ),
+    HDMIMatrixBinarySensorEntityDescription(
+        key="hdcp",
+        name="HDCP",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        value_fn=lambda output: output.hdcp,
+    ),
+    HDMIMatrixBinarySensorEntityDescription(
+        key="signal",
+        name="Signal",
+        inputs=True,
+        value_fn=lambda input_state: input_state.active,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the port status binary sensors of a matrix."""
+    async_add_port_entities(
+        entry, async_add_entities, HDMIMatrixPortBinarySensor, BINARY_SENSORS
+    )
+
+
+class HDMIMatrixPortBinarySensor(HDMIMatrixPortEntity, BinarySensorEntity):
+    """Connection or signal status of one port."""
+
+    entity_description: HDMIMatrixBinarySensorEntityDescription
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return true if the port is connected or has a signal."""
+        return self._value
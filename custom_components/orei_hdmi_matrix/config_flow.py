@@ -0,0 +1,63 @@
+"""Config flow for the OREI HDMI Matrix."""
+
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
+from homeassistant.const import CONF_HOST
+
+from . import async_api as matrix_api
+from .const import CONF_CONTROL_PORT, CONF_SOURCES, CONF_ZONES, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STEP_USER_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_HOST): str,
+        vol.Optional(CONF_CONTROL_PORT): vol.All(int, vol.Range(min=1, max=65535)),
+    }
+)
+
+
+class HDMIMatrixConfigFlow(ConfigFlow, domain=DOMAIN):
+    """Handle a config flow for an OREI HDMI Matrix."""
+
+    VERSION = 1
+
+    async def async_step_user(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Add a matrix and record its layout."""
+        errors = {}
+        if user_input is not None:
+            host = user_input[CONF_HOST]
+            await self.async_set_unique_id(host)
+            self._abort_if_unique_id_configured()
+
+            state = await matrix_api.get_state(host, use_cache=False)
+            if state is None:
+                _LOGGER.warning(f"Unable to contact host at: {host}")
+                errors["base"] = "cannot_connect"
+            else:
+                data = {
+                    CONF_HOST: host,
+                    CONF_SOURCES: [i.name for i in state.inputs],
+                    CONF_ZONES: list(state.zone_names),
+                }
+                if CONF_CONTROL_PORT in user_input:
+                    data[CONF_CONTROL_PORT] = user_input[CONF_CONTROL_PORT]
+                return self.async_create_entry(title=host, data=data)
+
+        return self.async_show_form(
+            step_id="user", data_schema=STEP_USER_SCHEMA, errors=errors
+        )
+
+    async def async_step_import(self, import_data: dict[str, Any]) -> ConfigFlowResult:
+        """Import a matrix configured in YAML without contacting it."""
+        await self.async_set_unique_id(import_data[CONF_HOST])
+        self._abort_if_unique_id_configured(updates=import_data)
+        return self.async_create_entry(title=import_data[CONF_HOST], data=import_data)
@@ -2,10 +2,16 @@ from __future__ import annotations
 
 from typing import Final
 
+DOMAIN: Final = "orei_hdmi_matrix"
+
 DATA_HDMIMATRIX: Final = "hdmi_matrix"
 
 SERVICE_SET_ZONE: Final = "hdmi_matrix_set_zone"
 
+SERVICE_SET_ROUTING: Final = "hdmi_matrix_set_routing"
+
+SERVICE_SET_CASCADE_SOURCE: Final = "hdmi_matrix_set_cascade_source"
+
 SERVICE_SET_SCALER: Final = "hdmi_matrix_set_scaler"
 
 SERVICE_SET_TX_STREAM: Final = "hdmi_matrix_set_tx_stream"
@@ -18,8 +24,18 @@ SERVICE_OUTPUT_CEC: Final = "hdmi_matrix_output_cec"
 
 SERVICE_INPUT_CEC: Final = "hdmi_matrix_input_cec"
 
+SERVICE_SAVE_PRESET: Final = "hdmi_matrix_save_preset"
+
+SERVICE_RECALL_PRESET: Final = "hdmi_matrix_recall_preset"
+
+SERVICE_DELETE_PRESET: Final = "hdmi_matrix_delete_preset"
+
+SERVICE_GET_PORT_EVENTS: Final = "hdmi_matrix_get_port_events"
+
 ATTR_SOURCE: Final = "source"
 
+ATTR_ROUTING: Final = "routing"
+
 CONF_ALL_SOURCE: Final = "allsource"
 
 CONF_SOURCES: Final = "allinputname"
@@ -57,3 +73,43 @@ ATTR_INPUT_EDID: Final = "input_edid"
 ATTR_INPUT_ACTIVE: Final = "input_active"
 
 ATTR_CEC_CMD: Final = "cec_cmd"
+
+DATA_HDMIMATRIX_COORDINATOR: Final = "hdmi_matrix_coordinator"
+
+DATA_ZONES: Final = "zones"
+
+ATTR_SOURCE_ID: Final = "source_id"
+
+ATTR_ZONE_ID: Final = "zone_id"
+
+EVENT_ZONE_CHANGED: Final = "orei_hdmi_matrix_zone_changed"
+
+CONF_TIMEOUT: Final = "timeout"
+
+CONF_COMMAND_TIMEOUT: Final = "command_timeout"
+
+CONF_RETRIES: Final = "retries"
+
+CONF_RETRY_DEADLINE: Final = "retry_deadline"
+
+CONF_FAILURE_THRESHOLD: Final = "failure_threshold"
+
+CONF_CIRCUIT_RESET: Final = "circuit_reset"
+
+CONF_MIN_SCAN_INTERVAL: Final = "min_scan_interval"
+
+CONF_MAX_SCAN_INTERVAL: Final = "max_scan_interval"
+
+CONF_CASCADE: Final = "cascade"
+
+CONF_INPUT: Final = "input"
+
+CONF_OUTPUT: Final = "output"
+
+ATTR_SOURCE_HOST: Final = "source_host"
+
+ATTR_PRESET: Final = "preset"
+
+CONF_CONTROL_PORT: Final = "control_port"
+
+ATTR_SINCE: Final = "since"
@@ -0,0 +1,297 @@
+"""Update coordinator for the OREI HDMI Matrix."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+import logging
+import time
+from typing import Any
+
+from homeassistant.const import CONF_HOST, STATE_OFF, STATE_ON, STATE_UNKNOWN
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from . import async_api as matrix_api, fleet
+from .const import (
+    ATTR_ARC,
+    ATTR_CONNECT,
+    ATTR_HDCP,
+    ATTR_INPUT_ACTIVE,
+    ATTR_INPUT_EDID,
+    ATTR_SCALER_MODE,
+    ATTR_SOURCE_ID,
+    ATTR_STREAM,
+    ATTR_ZONE_ID,
+    CONF_SOURCES,
+    CONF_ZONES,
+    DATA_ZONES,
+    DOMAIN,
+    EVENT_ZONE_CHANGED,
+)
+from .orei_hdmi_matrix import (
+    MatrixState,
+    PortEventHistory,
+    Preset,
+    edid_mode_name,
+    mode_name,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MIN_INTERVAL = timedelta(seconds=5)
+DEFAULT_MAX_INTERVAL = timedelta(seconds=60)
+
+# Keep polling at the minimum interval this long after a command or change.
+ACTIVE_PERIOD = timedelta(seconds=60)
+
+# Factor by which the interval grows with every unchanged poll.
+BACKOFF_FACTOR = 2
+
+STORAGE_VERSION = 1
+
+# Seconds to wait before writing a changed state, merging bursts of commands.
+SAVE_DELAY = 10
+
+
+def _store(hass: HomeAssistant, host: str) -> Store[dict[str, Any]]:
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{host}")
+
+
+def _preset_store(hass: HomeAssistant, host: str) -> Store[dict[str, Any]]:
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.{host}.presets")
+
+
+async def async_remove_snapshot(hass: HomeAssistant, host: str) -> None:
+    """Remove the stored state and presets of a matrix."""
+    await _store(hass, host).async_remove()
+    await _preset_store(hass, host).async_remove()
+
+
+def _on_off(value: bool | None) -> str:
+    if value is None:
+        return STATE_UNKNOWN
+    return STATE_ON if value else STATE_OFF
+
+
+def zone_views(state: MatrixState) -> dict[int, dict[str, Any]]:
+    """Build the per-zone attributes of a matrix state."""
+    zones = {}
+    for zone_id, source_id in enumerate(state.zone_sources, 1):
+        zone = {
+            ATTR_SOURCE_ID: source_id,
+            ATTR_SCALER_MODE: STATE_UNKNOWN,
+            ATTR_STREAM: STATE_UNKNOWN,
+            ATTR_ARC: STATE_UNKNOWN,
+            ATTR_CONNECT: STATE_UNKNOWN,
+            ATTR_HDCP: STATE_UNKNOWN,
+            ATTR_INPUT_EDID: STATE_UNKNOWN,
+            ATTR_INPUT_ACTIVE: STATE_UNKNOWN,
+        }
+        # The "All Outputs" zone has no output status of its own.
+        output = state.output(zone_id)
+        if output is not None:
+            zone[ATTR_SCALER_MODE] = mode_name(output.scaler)
+            zone[ATTR_STREAM] = _on_off(output.stream)
+            zone[ATTR_ARC] = _on_off(output.arc)
+            zone[ATTR_CONNECT] = _on_off(output.connected)
+            zone[ATTR_HDCP] = _on_off(output.hdcp)
+            input_state = state.input(source_id)
+            if input_state is not None:
+                zone[ATTR_INPUT_EDID] = edid_mode_name(input_state.edid)
+                zone[ATTR_INPUT_ACTIVE] = _on_off(input_state.active)
+        zones[zone_id] = zone
+    return zones
+
+
+def diff_zones(
+    old: dict[int, dict[str, Any]], new: dict[int, dict[str, Any]]
+) -> dict[int, dict[str, Any]]:
+    """Return the fields of each zone that differ between two snapshots."""
+    changes = {}
+    for zone_id, zone in new.items():
+        prev = old.get(zone_id)
+        if prev is None:
+            changes[zone_id] = dict(zone)
+            continue
+        changed = {key: value for key, value in zone.items() if prev.get(key) != value}
+        if changed:
+            changes[zone_id] = changed
+    return changes
+
+
+class HDMIMatrixCoordinator(DataUpdateCoordinator[dict[str, Any]]):
+    """Fetch all status documents of one matrix once per poll cycle."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        host: str,
+        min_interval: timedelta = DEFAULT_MIN_INTERVAL,
+        max_interval: timedelta = DEFAULT_MAX_INTERVAL,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"OREI HDMI Matrix {host}",
+            update_interval=min_interval,
+            always_update=False,
+        )
+        self.host = host
+        self._min_interval = min_interval
+        self._max_interval = max(min_interval, max_interval)
+        self._active_until = 0.0
+        # Fields of each zone changed by the latest update.
+        self.changed_zones: dict[int, dict[str, Any]] = {}
+        # Parsed state of the matrix, patched in place by commands.
+        self.state: MatrixState | None = None
+        self._store = _store(hass, host)
+        # Last state written to the store.
+        self._saved: dict[str, Any] | None = None
+        self._save_pending = False
+        # Named presets of the matrix, written as soon as they change.
+        self.presets: dict[str, Preset] = {}
+        self._preset_store = _preset_store(hass, host)
+        # Connect and signal transitions seen by the polls.
+        self.history = PortEventHistory()
+        self._remove_listener = matrix_api.add_command_listener(
+            host, self._handle_command
+        )
+
+    async def async_load_snapshot(self) -> None:
+        """Seed the coordinator with the state stored on the last run."""
+        saved = await self._store.async_load()
+        if saved is None:
+            return
+        try:
+            state = MatrixState.from_dict(saved)
+        except (KeyError, TypeError) as e:
+            _LOGGER.warning(f"Ignoring invalid stored state of {self.host}: {e!r}")
+            return
+        self._saved = saved
+        self.state = state
+        self.data = self._build_snapshot()
+
+    async def async_load_presets(self) -> None:
+        """Load the presets stored for the matrix."""
+        saved = await self._preset_store.async_load() or {}
+        for name, data in saved.items():
+            try:
+                self.presets[name] = Preset.from_dict(data)
+            except (AttributeError, TypeError, ValueError) as e:
+                _LOGGER.warning(
+                    f"Ignoring invalid preset '{name}' of {self.host}: {e!r}"
+                )
+
+    async def _async_save_presets(self) -> None:
+        await self._preset_store.async_save(
+            {name: preset.as_dict() for name, preset in self.presets.items()}
+        )
+
+    async def async_save_preset(self, name: str) -> bool:
+        """Store the current settings of the matrix as a named preset."""
+        if self.state is None:
+            return False
+        self.presets[name] = Preset.from_state(self.state)
+        await self._async_save_presets()
+        return True
+
+    async def async_recall_preset(self, name: str) -> bool:
+        """Apply a preset, sending only the settings that differ."""
+        preset = self.presets.get(name)
+        if preset is None:
+            return False
+        applied = await matrix_api.apply_preset(self.host, preset)
+        if applied is None:
+            return False
+        _LOGGER.debug(f"Recalled '{name}' on {self.host} with {len(applied)} commands")
+        return True
+
+    async def async_delete_preset(self, name: str) -> bool:
+        """Remove a preset."""
+        if self.presets.pop(name, None) is None:
+            return False
+        await self._async_save_presets()
+        return True
+
+    async def _async_update_data(self) -> dict[str, Any]:
+        """Fetch and parse the state of the matrix."""
+        self.changed_zones = {}
+        state = await fleet.get_state(self.host, use_cache=False)
+        if state is None:
+            self._adapt_interval(False)
+            raise UpdateFailed(f"Unable to contact host at: {self.host}")
+
+        self.state = state
+        self.history.observe(state, time.time())
+        snapshot = self._build_snapshot()
+        self._adapt_interval(bool(self.changed_zones))
+        return snapshot
+
+    def _adapt_interval(self, changed: bool) -> None:
+        """Poll fast while the matrix is in use and back off while it is idle."""
+        now = self.hass.loop.time()
+        if changed:
+            self._active_until = now + ACTIVE_PERIOD.total_seconds()
+
+        if matrix_api.circuit_open(self.host):
+            interval = self._max_interval
+        elif now < self._active_until:
+            interval = self._min_interval
+        else:
+            interval = min(self._max_interval, self.update_interval * BACKOFF_FACTOR)
+
+        if interval != self.update_interval:
+            _LOGGER.debug(f"Polling {self.host} every {interval}")
+            self.update_interval = interval
+
+    def _build_snapshot(self) -> dict[str, Any]:
+        """Build the zone views and record what changed since the last."""
+        # Only the topology is stored, so hot-plugging a display or a
+        # flapping link does not rewrite the file.
+        saved = self.state.topology()
+        if saved != self._saved:
+            self._saved = saved
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        zones = zone_views(self.state)
+        if self.data:
+            self.changed_zones = diff_zones(self.data[DATA_ZONES], zones)
+            for zone_id, changes in self.changed_zones.items():
+                self.hass.bus.async_fire(
+                    EVENT_ZONE_CHANGED,
+                    {CONF_HOST: self.host, ATTR_ZONE_ID: zone_id, **changes},
+                )
+        else:
+            self.changed_zones = zones
+        return {
+            CONF_HOST: self.host,
+            CONF_SOURCES: [i.name for i in self.state.inputs],
+            CONF_ZONES: list(self.state.zone_names),
+            DATA_ZONES: zones,
+        }
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        self._save_pending = False
+        return self._saved
+
+    @callback
+    def _handle_command(self, cmds: list[dict[str, Any]]) -> None:
+        """Apply control commands that succeeded to the state."""
+        if self.state is None:
+            return
+        self._adapt_interval(True)
+        applied = [self.state.apply(cmd) for cmd in cmds]
+        if not all(applied):
+            self.hass.async_create_task(self.async_request_refresh())
+            return
+        self.async_set_updated_data(self._build_snapshot())
+
+    async def async_shutdown(self) -> None:
+        """Stop following commands and write a pending state change."""
+        await super().async_shutdown()
+        self._remove_listener()
+        if self._save_pending:
+            await self._store.async_save(self._data_to_save())
@@ -0,0 +1,30 @@
+"""Diagnostics support for the OREI HDMI Matrix."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from . import async_api as matrix_api
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the state and request metrics of a matrix."""
+    coordinator = entry.runtime_data
+    host = coordinator.host
+    return {
+        "entry": dict(entry.data),
+        "update_interval": coordinator.update_interval.total_seconds(),
+        "last_update_success": coordinator.last_update_success,
+        "circuit_open": matrix_api.circuit_open(host),
+        "state": coordinator.state.as_dict() if coordinator.state else None,
+        "presets": {
+            name: preset.as_dict() for name, preset in coordinator.presets.items()
+        },
+        "port_events": coordinator.history.events(),
+        "metrics": matrix_api.metrics.as_dict(host),
+    }
@@ -0,0 +1,104 @@
+"""Base entity of the per-port settings and status of an OREI HDMI Matrix."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.entity import EntityDescription
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import HDMIMatrixCoordinator
+from .orei_hdmi_matrix import InputState, OutputState
+
+
+@dataclass(frozen=True, kw_only=True)
+class HDMIMatrixPortEntityDescription(EntityDescription):
+    """Describes an entity created for each output, or each input."""
+
+    inputs: bool = False
+    value_fn: Callable[[Any], Any]
+
+
+@callback
+def async_add_port_entities(
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+    entity_class: type[HDMIMatrixPortEntity],
+    descriptions: tuple[HDMIMatrixPortEntityDescription, ...],
+) -> None:
+    """Add an entity per port and description once the ports are known.
+
+    The entry is reloaded by the zones when the ports change, so the
+    entities are only added once.
+    """
+    coordinator: HDMIMatrixCoordinator = entry.runtime_data
+    added = False
+
+    @callback
+    def _async_add() -> None:
+        nonlocal added
+        state = coordinator.state
+        if added or state is None:
+            return
+        added = True
+        async_add_entities(
+            entity_class(coordinator, description, port)
+            for description in descriptions
+            for port in (state.inputs if description.inputs else state.outputs)
+        )
+
+    _async_add()
+    if not added:
+        entry.async_on_unload(coordinator.async_add_listener(_async_add))
+
+
+class HDMIMatrixPortEntity(CoordinatorEntity[HDMIMatrixCoordinator]):
+    """Setting or status of one port, written only when it changes."""
+
+    entity_description: HDMIMatrixPortEntityDescription
+
+    def __init__(
+        self,
+        coordinator: HDMIMatrixCoordinator,
+        description: HDMIMatrixPortEntityDescription,
+        port: InputState | OutputState,
+    ) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._port_id = port.input_id if description.inputs else port.output_id
+        self._attr_unique_id = f"{coordinator.host}-{description.key}-{self._port_id}"
+        self._attr_name = f"OREI HDMI Matrix - {port.name} {description.name}"
+        self._value = self._read()
+        self._last_available = self.available
+
+    @property
+    def host(self):
+        """Return the host of the matrix the port belongs to."""
+        return self.coordinator.host
+
+    def _read(self) -> Any:
+        state = self.coordinator.state
+        if state is None:
+            return None
+        if self.entity_description.inputs:
+            port = state.input(self._port_id)
+        else:
+            port = state.output(self._port_id)
+        return None if port is None else self.entity_description.value_fn(port)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only if the value of the port changed."""
+        value = self._read()
+        available = self.available
+        if value == self._value and available == self._last_available:
+            return
+        self._value = value
+        self._last_available = available
+        super()._handle_coordinator_update()
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import asyncio
+from datetime import timedelta
 import logging
 
 import voluptuous as vol
@@ -12,60 +14,95 @@ from homeassistant.components.media_player import (
     MediaPlayerEntityFeature,
 )
 from homeassistant.components.media_player.const import DOMAIN
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
 from homeassistant.const import (
     ATTR_ENTITY_ID,
     ATTR_STATE,
     CONF_HOST,
     CONF_NAME,
     CONF_TYPE,
-    STATE_OFF,
+    ENTITY_MATCH_ALL,
+    EVENT_HOMEASSISTANT_STOP,
     STATE_ON,
     STATE_UNKNOWN,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import (
+    Event,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+import homeassistant.util.dt as dt_util
 
-from . import api as matrix_api
+from . import async_api as matrix_api, fleet
 from .const import (
-    ATTR_ARC,
     ATTR_CEC_CMD,
-    ATTR_CONNECT,
-    ATTR_HDCP,
-    ATTR_INPUT_ACTIVE,
     ATTR_INPUT_EDID,
+    ATTR_PRESET,
+    ATTR_ROUTING,
     ATTR_SCALER_MODE,
+    ATTR_SINCE,
     ATTR_SOURCE,
-    ATTR_STREAM,
-    CONF_ALL_SOURCE,
-    CONF_ARC,
-    CONF_CONNECT,
-    CONF_EDID,
-    CONF_HDCP,
-    CONF_INPUT_ACTIVE,
-    CONF_OUT,
-    CONF_SCALER,
+    ATTR_SOURCE_HOST,
+    ATTR_SOURCE_ID,
+    CONF_CASCADE,
+    CONF_CIRCUIT_RESET,
+    CONF_COMMAND_TIMEOUT,
+    CONF_CONTROL_PORT,
+    CONF_FAILURE_THRESHOLD,
+    CONF_INPUT,
+    CONF_MAX_SCAN_INTERVAL,
+    CONF_MIN_SCAN_INTERVAL,
+    CONF_OUTPUT,
+    CONF_RETRIES,
+    CONF_RETRY_DEADLINE,
     CONF_SOURCES,
+    CONF_TIMEOUT,
     CONF_ZONES,
     DATA_HDMIMATRIX,
+    DATA_HDMIMATRIX_COORDINATOR,
+    DATA_ZONES,
+    DOMAIN as MATRIX_DOMAIN,
+    SERVICE_DELETE_PRESET,
+    SERVICE_GET_PORT_EVENTS,
     SERVICE_INPUT_CEC,
     SERVICE_OUTPUT_CEC,
+    SERVICE_RECALL_PRESET,
+    SERVICE_SAVE_PRESET,
     SERVICE_SET_ARC,
+    SERVICE_SET_CASCADE_SOURCE,
     SERVICE_SET_INPUT_EDID,
+    SERVICE_SET_ROUTING,
     SERVICE_SET_SCALER,
     SERVICE_SET_TX_STREAM,
     SERVICE_SET_ZONE,
 )
+from .coordinator import (
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    HDMIMatrixCoordinator,
+)
 from .orei_hdmi_matrix import (
     EDIDModes,
     InputCECCommands,
     OutputCECCommands,
+    RetryPolicy,
     ScalerModes,
+    TCPTransport,
+    edid_mode,
+    edid_mode_name,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
 SUPPORT_HDMIMATRIX = MediaPlayerEntityFeature.SELECT_SOURCE
 
 MEDIA_PLAYER_SCHEMA = vol.Schema(
@@ -86,10 +123,46 @@ SOURCE_SCHEMA = vol.Schema(
     }
 )
 
+# An output of this matrix feeding an input of another one.
+CASCADE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_OUTPUT): cv.positive_int,
+        vol.Required(CONF_HOST): cv.string,
+        vol.Required(CONF_INPUT): cv.positive_int,
+    }
+)
+
 SERVICE_SET_ZONE_SCHEMA = MEDIA_PLAYER_SCHEMA.extend(
     {vol.Required(ATTR_SOURCE): cv.string}
 )
 
+SERVICE_SET_ROUTING_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ROUTING): vol.All(
+            {cv.entity_id: cv.string}, vol.Length(min=1)
+        ),
+    }
+)
+
+SERVICE_SET_CASCADE_SOURCE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required(ATTR_SOURCE_HOST): cv.string,
+        vol.Required(ATTR_SOURCE): vol.Any(cv.positive_int, cv.string),
+    }
+)
+
+SERVICE_PRESET_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Required(ATTR_PRESET): cv.string,
+    }
+)
+
+SERVICE_GET_PORT_EVENTS_SCHEMA = MEDIA_PLAYER_SCHEMA.extend(
+    {vol.Optional(ATTR_SINCE): cv.datetime}
+)
+
 SERVICE_SET_SCALER_SCHEMA = vol.Schema(
     {
         vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
@@ -114,7 +187,8 @@ SERVICE_SET_TX_STREAM_SCHEMA = vol.Schema(
 SERVICE_SET_INPUT_EDID_SCHEMA = vol.Schema(
     {
         vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
-        vol.Required(ATTR_INPUT_EDID): cv.enum(EDIDModes),
+        # Also accepts EDID_COPY_FROM_OUT_<n> for outputs past the eighth.
+        vol.Required(ATTR_INPUT_EDID): edid_mode,
     }
 )
 
@@ -137,231 +211,370 @@ PLATFORM_SCHEMA = vol.All(
     PLATFORM_SCHEMA.extend(
         {
             vol.Exclusive(CONF_HOST, CONF_TYPE): cv.string,
+            vol.Optional(
+                CONF_TIMEOUT, default=DEFAULT_RETRY_POLICY.read_timeout
+            ): cv.positive_float,
+            vol.Optional(
+                CONF_COMMAND_TIMEOUT, default=DEFAULT_RETRY_POLICY.write_timeout
+            ): cv.positive_float,
+            vol.Optional(
+                CONF_RETRIES, default=DEFAULT_RETRY_POLICY.attempts - 1
+            ): cv.positive_int,
+            vol.Optional(
+                CONF_RETRY_DEADLINE, default=DEFAULT_RETRY_POLICY.deadline
+            ): cv.positive_float,
+            vol.Optional(
+                CONF_FAILURE_THRESHOLD, default=DEFAULT_RETRY_POLICY.failure_threshold
+            ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+            vol.Optional(
+                CONF_CIRCUIT_RESET, default=DEFAULT_RETRY_POLICY.reset_timeout
+            ): cv.positive_float,
+            vol.Optional(
+                CONF_MIN_SCAN_INTERVAL, default=DEFAULT_MIN_INTERVAL
+            ): cv.positive_time_period,
+            vol.Optional(
+                CONF_MAX_SCAN_INTERVAL, default=DEFAULT_MAX_INTERVAL
+            ): cv.positive_time_period,
+            vol.Optional(CONF_CASCADE, default=[]): [CASCADE_SCHEMA],
+            vol.Optional(CONF_CONTROL_PORT): cv.port,
         }
     ),
 )
 
 
-def setup_platform(
+async def async_setup_platform(
     hass: HomeAssistant,
     config: ConfigType,
     add_entities: AddEntitiesCallback,
     discovery_info: DiscoveryInfoType | None = None,
 ) -> None:
-    """Set up the HDMI Matrix platform."""
-
-    if DATA_HDMIMATRIX not in hass.data:
-        hass.data[DATA_HDMIMATRIX] = {}
-
-    data = None
-    connection = None
-    host = config.get(CONF_HOST)
-    if host is not None:
-        data = matrix_api.get_video_status(host)
-        if data is not None:
-            connection = host
-
-    if data is None or connection is None:
-        _LOGGER.error(f"Failed to setup platform, unable to contact host at: {host}")
-        return
-
-    sources = dict(
-        zip(range(1, len(data[CONF_SOURCES]) + 1), data[CONF_SOURCES], strict=False)
+    """Import the YAML configuration into a config entry."""
+    hass.async_create_task(
+        hass.config_entries.flow.async_init(
+            MATRIX_DOMAIN,
+            context={"source": SOURCE_IMPORT},
+            data={
+                CONF_HOST: config[CONF_HOST],
+                CONF_TIMEOUT: config[CONF_TIMEOUT],
+                CONF_COMMAND_TIMEOUT: config[CONF_COMMAND_TIMEOUT],
+                CONF_RETRIES: config[CONF_RETRIES],
+                CONF_RETRY_DEADLINE: config[CONF_RETRY_DEADLINE],
+                CONF_FAILURE_THRESHOLD: config[CONF_FAILURE_THRESHOLD],
+                CONF_CIRCUIT_RESET: config[CONF_CIRCUIT_RESET],
+                CONF_MIN_SCAN_INTERVAL: config[CONF_MIN_SCAN_INTERVAL].total_seconds(),
+                CONF_MAX_SCAN_INTERVAL: config[CONF_MAX_SCAN_INTERVAL].total_seconds(),
+                CONF_CASCADE: config[CONF_CASCADE],
+                CONF_CONTROL_PORT: config.get(CONF_CONTROL_PORT),
+            },
+        )
     )
 
-    devices = []
-    for zone_id, name in zip(
-        range(1, len(data[CONF_ZONES]) + 1), data[CONF_ZONES], strict=False
-    ):
-        _LOGGER.info("Adding zone %d - %s", zone_id, name)
-        unique_id = f"{connection}-{zone_id}"
-        device = HDMIMatrixZone(connection, sources, zone_id, name)
-        hass.data[DATA_HDMIMATRIX][unique_id] = device
-        devices.append(device)
-
-    add_entities(devices, True)
-
-    def set_source_service_handle(service):
-        """Handler for setting source service."""
-        entity_ids = service.data.get(ATTR_ENTITY_ID)
-        source = service.data.get(ATTR_SOURCE)
-        if entity_ids:
-            devices = [
-                device
-                for device in hass.data[DATA_HDMIMATRIX].values()
-                if device.entity_id in entity_ids
-            ]
-        else:
-            devices = hass.data[DATA_HDMIMATRIX].values()
-
-        for device in devices:
-            if service.service == SERVICE_SET_ZONE:
-                device.select_source(source)
-
-    def set_scaler_mode_service_handle(service):
-        """Handler for setting scaler mode service."""
-        entity_ids = service.data.get(ATTR_ENTITY_ID)
-        scaler_mode = service.data.get(ATTR_SCALER_MODE)
-
-        if entity_ids:
-            devices = [
-                device
-                for device in hass.data[DATA_HDMIMATRIX].values()
-                if device.entity_id in entity_ids
-            ]
-        else:
-            devices = hass.data[DATA_HDMIMATRIX].values()
-
-        for device in devices:
-            if service.service == SERVICE_SET_SCALER:
-                device.set_scaler_mode(scaler_mode)
-
-    def set_arc_service_handle(service):
-        """Handler for setting ARC service."""
-        entity_ids = service.data.get(ATTR_ENTITY_ID)
-        state = service.data.get(ATTR_STATE)
-
-        if entity_ids:
-            devices = [
-                device
-                for device in hass.data[DATA_HDMIMATRIX].values()
-                if device.entity_id in entity_ids
-            ]
-        else:
-            devices = hass.data[DATA_HDMIMATRIX].values()
-
-        for device in devices:
-            if service.service == SERVICE_SET_ARC:
-                device.set_arc(state)
-
-    def set_tx_stream_service_handle(service):
-        """Handler for setting TX Stream service."""
-        entity_ids = service.data.get(ATTR_ENTITY_ID)
-        state = service.data.get(ATTR_STATE)
-
-        if entity_ids:
-            devices = [
-                device
-                for device in hass.data[DATA_HDMIMATRIX].values()
-                if device.entity_id in entity_ids
-            ]
-        else:
-            devices = hass.data[DATA_HDMIMATRIX].values()
-
-        for device in devices:
-            if service.service == SERVICE_SET_TX_STREAM:
-                device.set_tx_stream(state)
-
-    def set_input_edid_service_handle(service):
-        """Handler for setting input EDID service."""
-        entity_ids = service.data.get(ATTR_ENTITY_ID)
-        input_edid = service.data.get(ATTR_INPUT_EDID)
-
-        if entity_ids:
-            devices = [
-                device
-                for device in hass.data[DATA_HDMIMATRIX].values()
-                if device.entity_id in entity_ids
-            ]
-        else:
-            devices = hass.data[DATA_HDMIMATRIX].values()
-
-        for device in devices:
-            if service.service == SERVICE_SET_INPUT_EDID:
-                device.set_input_edid(input_edid)
-
-    def output_cec_command_service_handle(service):
-        """Handler for sending output CEC command."""
-        entity_ids = service.data.get(ATTR_ENTITY_ID)
-        cmd = service.data.get(ATTR_CEC_CMD)
-
-        if entity_ids:
-            devices = [
-                device
-                for device in hass.data[DATA_HDMIMATRIX].values()
-                if device.entity_id in entity_ids
-            ]
-        else:
-            devices = hass.data[DATA_HDMIMATRIX].values()
-
-        for device in devices:
-            if service.service == SERVICE_OUTPUT_CEC:
-                device.output_cec_command(cmd)
-
-    def input_cec_command_service_handle(service):
-        """Handler for sending input CEC command."""
-        entity_ids = service.data.get(ATTR_ENTITY_ID)
-        cmd = service.data.get(ATTR_CEC_CMD)
-
-        if entity_ids:
-            devices = [
-                device
-                for device in hass.data[DATA_HDMIMATRIX].values()
-                if device.entity_id in entity_ids
-            ]
-        else:
-            devices = hass.data[DATA_HDMIMATRIX].values()
-
-        for device in devices:
-            if service.service == SERVICE_INPUT_CEC:
-                device.input_cec_command(cmd)
 
-    hass.services.register(
-        DOMAIN,
-        SERVICE_SET_ZONE,
-        set_source_service_handle,
-        schema=SERVICE_SET_ZONE_SCHEMA,
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the zones of a matrix without waiting for it to respond.
+
+    The zones are created right away from the state stored on the last run,
+    or the layout recorded by the config flow, and the matrix is contacted
+    in the background. Without either the zones are added after the first
+    successful update. The entry is reloaded if the names reported by the
+    matrix differ from the ones the zones were created with.
+    """
+    hass.data.setdefault(DATA_HDMIMATRIX, {})
+    hass.data.setdefault(DATA_HDMIMATRIX_COORDINATOR, {})
+    if not hass.services.has_service(DOMAIN, SERVICE_SET_ZONE):
+        _async_register_services(hass)
+
+    host = entry.data[CONF_HOST]
+    config = entry.data
+    matrix_api.set_retry_policy(
+        host,
+        RetryPolicy(
+            read_timeout=config.get(CONF_TIMEOUT, DEFAULT_RETRY_POLICY.read_timeout),
+            write_timeout=config.get(
+                CONF_COMMAND_TIMEOUT, DEFAULT_RETRY_POLICY.write_timeout
+            ),
+            attempts=config.get(CONF_RETRIES, DEFAULT_RETRY_POLICY.attempts - 1) + 1,
+            deadline=config.get(CONF_RETRY_DEADLINE, DEFAULT_RETRY_POLICY.deadline),
+            failure_threshold=config.get(
+                CONF_FAILURE_THRESHOLD, DEFAULT_RETRY_POLICY.failure_threshold
+            ),
+            reset_timeout=config.get(
+                CONF_CIRCUIT_RESET, DEFAULT_RETRY_POLICY.reset_timeout
+            ),
+        ),
     )
-
-    hass.services.register(
-        DOMAIN,
-        SERVICE_SET_SCALER,
-        set_scaler_mode_service_handle,
-        schema=SERVICE_SET_SCALER_SCHEMA,
+    if config.get(CONF_CONTROL_PORT):
+        transport = TCPTransport(host, config[CONF_CONTROL_PORT])
+        matrix_api.set_transport(host, transport)
+
+        async def _async_close_transport() -> None:
+            matrix_api.set_transport(host, None)
+            await transport.close()
+
+        entry.async_on_unload(_async_close_transport)
+
+    coordinator = HDMIMatrixCoordinator(
+        hass,
+        host,
+        timedelta(
+            seconds=config.get(
+                CONF_MIN_SCAN_INTERVAL, DEFAULT_MIN_INTERVAL.total_seconds()
+            )
+        ),
+        timedelta(
+            seconds=config.get(
+                CONF_MAX_SCAN_INTERVAL, DEFAULT_MAX_INTERVAL.total_seconds()
+            )
+        ),
     )
-
-    hass.services.register(
-        DOMAIN,
-        SERVICE_SET_ARC,
-        set_arc_service_handle,
-        schema=SERVICE_SET_ARC_SCHEMA,
+    hass.data[DATA_HDMIMATRIX_COORDINATOR][host] = coordinator
+    entry.runtime_data = coordinator
+    fleet.add_host(host)
+    for link in entry.data.get(CONF_CASCADE, []):
+        fleet.add_link(host, link[CONF_OUTPUT], link[CONF_HOST], link[CONF_INPUT])
+    entry.async_on_unload(lambda: fleet.remove_host(host))
+
+    await coordinator.async_load_snapshot()
+    await coordinator.async_load_presets()
+
+    # Source and zone names the zones were created with.
+    layout = None
+    if coordinator.data is not None:
+        layout = (coordinator.data[CONF_SOURCES], coordinator.data[CONF_ZONES])
+    elif CONF_ZONES in entry.data:
+        layout = (entry.data[CONF_SOURCES], entry.data[CONF_ZONES])
+    if layout is not None:
+        async_add_entities(_zone_entities(coordinator, *layout))
+
+    @callback
+    def _async_reconcile_layout() -> None:
+        """Add the zones once the layout is known, reload if it changed."""
+        nonlocal layout
+        if coordinator.data is None:
+            return
+        current = (coordinator.data[CONF_SOURCES], coordinator.data[CONF_ZONES])
+        if layout is None:
+            layout = current
+            async_add_entities(_zone_entities(coordinator, *layout))
+        elif current != layout:
+            _LOGGER.info(f"Inputs or outputs of {host} changed, reloading")
+            hass.config_entries.async_schedule_reload(entry.entry_id)
+
+    # Until there are zones the listener also keeps the coordinator polling,
+    # with its usual backoff, until the matrix responds.
+    entry.async_on_unload(coordinator.async_add_listener(_async_reconcile_layout))
+
+    entry.async_create_background_task(
+        hass, coordinator.async_refresh(), f"OREI HDMI Matrix {host} refresh"
     )
 
-    hass.services.register(
-        DOMAIN,
-        SERVICE_SET_TX_STREAM,
-        set_tx_stream_service_handle,
-        schema=SERVICE_SET_TX_STREAM_SCHEMA,
-    )
 
-    hass.services.register(
-        DOMAIN,
-        SERVICE_SET_INPUT_EDID,
-        set_input_edid_service_handle,
-        schema=SERVICE_SET_INPUT_EDID_SCHEMA,
-    )
+def _zone_entities(coordinator, source_names, zone_names) -> list[HDMIMatrixZone]:
+    """Create the zones of a matrix from its source and zone names."""
+    sources = dict(enumerate(source_names, 1))
+    devices = []
+    for zone_id, name in enumerate(zone_names, 1):
+        _LOGGER.info("Adding zone %d - %s", zone_id, name)
+        devices.append(HDMIMatrixZone(coordinator, sources, zone_id, name))
+    return devices
+
+
+def _target_entity_ids(data):
+    """Return the entity ids targeted by the data of a service call."""
+    # hdmi_matrix_set_routing targets only the zones it routes.
+    if ATTR_ROUTING in data:
+        return list(data[ATTR_ROUTING])
+    return data.get(ATTR_ENTITY_ID)
+
+
+def _zones_by_host(hass: HomeAssistant, entity_ids) -> dict[str, list[HDMIMatrixZone]]:
+    """Look up the targeted zones and group them by matrix.
+
+    All zones are targeted if entity_ids is empty or "all".
+    """
+    index = hass.data[DATA_HDMIMATRIX]
+    if not entity_ids or entity_ids == ENTITY_MATCH_ALL:
+        zones = list(index.values())
+    else:
+        zones = [index[entity_id] for entity_id in entity_ids if entity_id in index]
+    by_host = {}
+    for zone in zones:
+        by_host.setdefault(zone.host, []).append(zone)
+    return by_host
+
+
+def _for_each_zone(method, attr):
+    """Build a handler calling a zone method with a service field."""
+
+    async def handler(service: ServiceCall, host, zones) -> None:
+        await asyncio.gather(*(method(zone, service.data[attr]) for zone in zones))
+
+    return handler
+
+
+async def _async_set_zone(service: ServiceCall, host, zones) -> None:
+    """Switch zones of one matrix to a source in one batch."""
+    source = service.data[ATTR_SOURCE]
+    routing = {}
+    for zone in zones:
+        source_id = zone.source_id(source)
+        if source_id is not None:
+            routing[zone.zone_id] = source_id
+    if routing:
+        await matrix_api.apply_routing(host, routing)
+
+
+async def _async_set_routing(service: ServiceCall, host, zones) -> None:
+    """Switch zones of one matrix to their own sources in one batch."""
+    routing = {}
+    for zone in zones:
+        source = service.data[ATTR_ROUTING][zone.entity_id]
+        source_id = zone.source_id(source)
+        if source_id is None:
+            _LOGGER.warning(f"Unknown source '{source}' for {zone.entity_id}")
+            continue
+        routing[zone.zone_id] = source_id
+    if routing:
+        await matrix_api.apply_routing(host, routing)
+
+
+async def _async_set_cascade_source(service: ServiceCall, host, zones) -> None:
+    """Show a source of a cascaded matrix on zones of one matrix."""
+    source_host = service.data[ATTR_SOURCE_HOST]
+    source = service.data[ATTR_SOURCE]
+    if isinstance(source, int):
+        input_id = source
+    else:
+        # Cached, so resolving it for every matrix costs one read at most.
+        state = await fleet.get_state(source_host)
+        input_id = state.input_ids.get(source) if state else None
+    if input_id is None:
+        _LOGGER.warning(f"Unknown source '{source}' on {source_host}")
+        return
+    await fleet.route(source_host, input_id, host, [zone.zone_id for zone in zones])
+
+
+async def _async_preset(service: ServiceCall, host, zones) -> None:
+    """Save, recall or delete a preset of one matrix."""
+    coordinator = zones[0].coordinator
+    name = service.data[ATTR_PRESET]
+    if service.service == SERVICE_SAVE_PRESET:
+        ok = await coordinator.async_save_preset(name)
+    elif service.service == SERVICE_RECALL_PRESET:
+        ok = await coordinator.async_recall_preset(name)
+    else:
+        ok = await coordinator.async_delete_preset(name)
+    if not ok:
+        _LOGGER.warning(f"Unable to {service.service} '{name}' on {host}")
+
+
+async def _async_output_cec(service: ServiceCall, host, zones) -> None:
+    """Send a CEC command to the zones of one matrix as one port mask."""
+    ports = {zone.zone_id - 1 for zone in zones}
+    await matrix_api.output_cec_command(host, ports, service.data[ATTR_CEC_CMD])
+
+
+async def _async_input_cec(service: ServiceCall, host, zones) -> None:
+    """Send a CEC command to the sources of zones of one matrix as one mask."""
+    ports = {zone.input_id - 1 for zone in zones if zone.input_id is not None}
+    if ports:
+        await matrix_api.input_cec_command(host, ports, service.data[ATTR_CEC_CMD])
+
+
+@callback
+def _async_register_services(hass: HomeAssistant) -> None:
+    """Register the matrix services shared by all config entries.
+
+    Every service goes through one dispatcher, which looks the targeted
+    zones up by entity id and runs the handler of the service once per
+    matrix with its zones, all matrices concurrently.
+    """
+
+    async def close_connections(event: Event) -> None:
+        """Close pooled connections to the matrix on shutdown."""
+        await matrix_api.close()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, close_connections)
+
+    services = {
+        SERVICE_SET_ZONE: (SERVICE_SET_ZONE_SCHEMA, _async_set_zone),
+        SERVICE_SET_ROUTING: (SERVICE_SET_ROUTING_SCHEMA, _async_set_routing),
+        SERVICE_SET_CASCADE_SOURCE: (
+            SERVICE_SET_CASCADE_SOURCE_SCHEMA,
+            _async_set_cascade_source,
+        ),
+        SERVICE_SAVE_PRESET: (SERVICE_PRESET_SCHEMA, _async_preset),
+        SERVICE_RECALL_PRESET: (SERVICE_PRESET_SCHEMA, _async_preset),
+        SERVICE_DELETE_PRESET: (SERVICE_PRESET_SCHEMA, _async_preset),
+        SERVICE_SET_SCALER: (
+            SERVICE_SET_SCALER_SCHEMA,
+            _for_each_zone(HDMIMatrixZone.async_set_scaler_mode, ATTR_SCALER_MODE),
+        ),
+        SERVICE_SET_ARC: (
+            SERVICE_SET_ARC_SCHEMA,
+            _for_each_zone(HDMIMatrixZone.async_set_arc, ATTR_STATE),
+        ),
+        SERVICE_SET_TX_STREAM: (
+            SERVICE_SET_TX_STREAM_SCHEMA,
+            _for_each_zone(HDMIMatrixZone.async_set_tx_stream, ATTR_STATE),
+        ),
+        SERVICE_SET_INPUT_EDID: (
+            SERVICE_SET_INPUT_EDID_SCHEMA,
+            _for_each_zone(HDMIMatrixZone.async_set_input_edid, ATTR_INPUT_EDID),
+        ),
+        SERVICE_OUTPUT_CEC: (SERVICE_OUTPUT_CEC_SCHEMA, _async_output_cec),
+        SERVICE_INPUT_CEC: (SERVICE_INPUT_CEC_SCHEMA, _async_input_cec),
+    }
 
-    hass.services.register(
-        DOMAIN,
-        SERVICE_OUTPUT_CEC,
-        output_cec_command_service_handle,
-        schema=SERVICE_OUTPUT_CEC_SCHEMA,
-    )
+    async def dispatch(service: ServiceCall) -> None:
+        """Run the handler of a service for each targeted matrix."""
+        handler = services[service.service][1]
+        entity_ids = _target_entity_ids(service.data)
+        await asyncio.gather(
+            *(
+                handler(service, host, zones)
+                for host, zones in _zones_by_host(hass, entity_ids).items()
+            )
+        )
+
+    for service, (schema, _) in services.items():
+        hass.services.async_register(DOMAIN, service, dispatch, schema=schema)
+
+    async def get_port_events(service: ServiceCall) -> ServiceResponse:
+        """Return the port events of the targeted matrices."""
+        since = service.data.get(ATTR_SINCE)
+        timestamp = dt_util.as_timestamp(since) if since else None
+        zones = _zones_by_host(hass, service.data.get(ATTR_ENTITY_ID))
+        return {
+            host: [
+                {**event, "time": dt_util.utc_from_timestamp(event["time"]).isoformat()}
+                for event in host_zones[0].coordinator.history.events(timestamp)
+            ]
+            for host, host_zones in zones.items()
+        }
 
-    hass.services.register(
+    hass.services.async_register(
         DOMAIN,
-        SERVICE_INPUT_CEC,
-        input_cec_command_service_handle,
-        schema=SERVICE_INPUT_CEC_SCHEMA,
+        SERVICE_GET_PORT_EVENTS,
+        get_port_events,
+        schema=SERVICE_GET_PORT_EVENTS_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
     )
 
 
-class HDMIMatrixZone(MediaPlayerEntity):
+class HDMIMatrixZone(CoordinatorEntity[HDMIMatrixCoordinator], MediaPlayerEntity):
     """Representation of a HDMI matrix zone."""
 
-    def __init__(self, host, sources, zone_id, zone_name):
+    _unrecorded_attributes = frozenset({CONF_HOST})
+
+    def __init__(self, coordinator, sources, zone_id, zone_name):
         """Initialize new zone."""
-        self._host = host
+        super().__init__(coordinator)
+        self._host = coordinator.host
         self._source_id = STATE_UNKNOWN
         # dict source_id -> source name
         self._source_id_name = sources
@@ -372,72 +585,44 @@ class HDMIMatrixZone(MediaPlayerEntity):
             self._source_name_id.keys(), key=lambda v: self._source_name_id[v]
         )
         self._zone_id = zone_id
+        self._attr_unique_id = f"{self._host}-{zone_id}"
         self._name = f"OREI HDMI Matrix - {zone_name}"
         self._state = None
         self._source = None
-        self._attributes = {
-            CONF_HOST: self._host,
-            ATTR_SCALER_MODE: STATE_UNKNOWN,
-            ATTR_STREAM: STATE_UNKNOWN,
-            ATTR_ARC: STATE_UNKNOWN,
-            ATTR_CONNECT: STATE_UNKNOWN,
-            ATTR_HDCP: STATE_UNKNOWN,
-            ATTR_INPUT_EDID: STATE_UNKNOWN,
-            ATTR_INPUT_ACTIVE: STATE_UNKNOWN,
-        }
-
-    def update(self):
-        """Retrieve latest state."""
-        video_status = matrix_api.get_video_status(self._host)
-        if video_status is None:
-            self._state = STATE_UNKNOWN
-            return
-        self._source_id = video_status[CONF_ALL_SOURCE][self._zone_id - 1]
-
-        output_status = matrix_api.get_output_status(self._host)
-        if output_status is None:
-            self._state = STATE_UNKNOWN
+        self._last_available = True
+        # The port settings and status have entities of their own.
+        self._attr_extra_state_attributes = {CONF_HOST: self._host}
+
+    async def async_added_to_hass(self) -> None:
+        """Apply the snapshot fetched during setup and accept service calls."""
+        await super().async_added_to_hass()
+        self._update_from_snapshot()
+        self.hass.data[DATA_HDMIMATRIX][self.entity_id] = self
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Stop routing service calls to the zone."""
+        await super().async_will_remove_from_hass()
+        self.hass.data[DATA_HDMIMATRIX].pop(self.entity_id, None)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Read the latest snapshot from the coordinator if the source changed."""
+        available = self.available
+        changes = self.coordinator.changed_zones.get(self._zone_id, {})
+        if ATTR_SOURCE_ID not in changes and available == self._last_available:
             return
-
-        input_status = matrix_api.get_input_status(self._host)
-        if input_status is None:
+        self._last_available = available
+        self._update_from_snapshot()
+        super()._handle_coordinator_update()
+
+    def _update_from_snapshot(self) -> None:
+        data = self.coordinator.data
+        zone = data[DATA_ZONES].get(self._zone_id) if data else None
+        if zone is None or not self.coordinator.last_update_success:
             self._state = STATE_UNKNOWN
             return
 
-        # The last zone_id is for "All Outputs" and does not have output status.
-        if self._zone_id < 9:
-            self._attributes[ATTR_SCALER_MODE] = ScalerModes(
-                output_status[CONF_SCALER][self._zone_id - 1]
-            ).name
-            self._attributes[ATTR_STREAM] = (
-                STATE_ON
-                if output_status[CONF_OUT][self._zone_id - 1] == 1
-                else STATE_OFF
-            )
-            self._attributes[ATTR_ARC] = (
-                STATE_ON
-                if output_status[CONF_ARC][self._zone_id - 1] == 1
-                else STATE_OFF
-            )
-            self._attributes[ATTR_CONNECT] = (
-                STATE_ON
-                if output_status[CONF_CONNECT][self._zone_id - 1] == 1
-                else STATE_OFF
-            )
-            self._attributes[ATTR_HDCP] = (
-                STATE_ON
-                if output_status[CONF_HDCP][self._zone_id - 1] == 1
-                else STATE_OFF
-            )
-            self._attributes[ATTR_INPUT_EDID] = EDIDModes(
-                input_status[CONF_EDID][self._source_id - 1] + 1
-            ).name
-
-            self._attributes[ATTR_INPUT_ACTIVE] = (
-                STATE_ON
-                if input_status[CONF_INPUT_ACTIVE][self._source_id - 1]
-                else STATE_OFF
-            )
+        self._source_id = zone[ATTR_SOURCE_ID]
 
         idx = self._source_id
         self._state = STATE_ON
@@ -445,7 +630,25 @@ class HDMIMatrixZone(MediaPlayerEntity):
             self._source = self._source_id_name[idx]
         else:
             self._source = None
-        self._attr_extra_state_attributes = self._attributes
+
+    @property
+    def host(self):
+        """Return the host of the matrix the zone belongs to."""
+        return self._host
+
+    @property
+    def zone_id(self):
+        """Return the output id of the zone."""
+        return self._zone_id
+
+    @property
+    def input_id(self):
+        """Return the input id of the current source, or None if unknown."""
+        return self._source_id if self._source_id in self._source_id_name else None
+
+    def source_id(self, source):
+        """Return the input id of a source name, or None if unknown."""
+        return self._source_name_id.get(source)
 
     @property
     def name(self):
@@ -477,47 +680,35 @@ class HDMIMatrixZone(MediaPlayerEntity):
         """List of available input sources."""
         return self._source_names
 
-    def select_source(self, source):
+    async def async_select_source(self, source):
         """Set input source."""
         if source not in self._source_name_id:
             return
         idx = self._source_name_id[source]
         _LOGGER.info("Setting zone %d source to %s", self._zone_id, idx)
 
-        matrix_api.video_switch(self._host, idx, self._zone_id)
+        await matrix_api.video_switch(self._host, idx, self._zone_id)
 
-    def set_scaler_mode(self, scaler_mode: ScalerModes):
+    async def async_set_scaler_mode(self, scaler_mode: ScalerModes):
         """Set scaler mode."""
         _LOGGER.info(
             f"Setting scaler mode for zone {self._zone_id} to value {scaler_mode.value}"
         )
-        matrix_api.video_scaler(self._host, self._zone_id, scaler_mode.value)
+        await matrix_api.video_scaler(self._host, self._zone_id, scaler_mode)
 
-    def set_arc(self, on_state):
+    async def async_set_arc(self, on_state):
         """Set ARC state"""
         _LOGGER.info(f"Setting ARC for zone {self._zone_id} to value {on_state}")
-        matrix_api.set_arc(self._host, self._zone_id, on_state)
+        await matrix_api.set_arc(self._host, self._zone_id, on_state)
 
-    def set_tx_stream(self, on_state):
+    async def async_set_tx_stream(self, on_state):
         """Set output stream."""
         _LOGGER.info(f"Setting TX stream for zone {self._zone_id} to value {on_state}")
-        matrix_api.tx_stream(self._host, self._zone_id, on_state)
+        await matrix_api.tx_stream(self._host, self._zone_id, on_state)
 
-    def set_input_edid(self, input_edid: EDIDModes):
+    async def async_set_input_edid(self, input_edid: EDIDModes | int):
         """Set EDID of selected source."""
-        _LOGGER.info(f"Setting EDID of input {self._source_id} to {input_edid.name}")
-        matrix_api.set_input_edid(self._host, self._source_id, input_edid)
-
-    def output_cec_command(self, cmd: OutputCECCommands):
-        """Send output CEC command."""
-        _LOGGER.info(
-            f"Sending output id {self._name}={self._zone_id} CEC command: {cmd.name}={cmd.value}"
-        )
-        matrix_api.output_cec_command(self._host, (self._zone_id - 1), cmd)
-
-    def input_cec_command(self, cmd: InputCECCommands):
-        """Send input CEC command."""
         _LOGGER.info(
-            f"Sending input id {self._source_names[self._source_id - 1]}={self._source_id} CEC command: {cmd.name}={cmd.value}"
+            f"Setting EDID of input {self._source_id} to {edid_mode_name(input_edid)}"
         )
-        matrix_api.input_cec_command(self._host, (self._source_id - 1), cmd)
+        await matrix_api.set_input_edid(self._host, self._source_id, input_edid)
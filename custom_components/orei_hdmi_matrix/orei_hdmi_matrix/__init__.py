@@ -1,7 +1,19 @@
 from .orei_hdmi_matrix import (
+    AsyncHDMIMatrixAPI,
     EDIDModes,
     HDMIMatrixAPI,
     InputCECCommands,
     OutputCECCommands,
     ScalerModes,
+    patch_status,
 )
+from .commands import COMMANDS, Command
+from .fleet import HDMIMatrixFleet
+from .history import PortEvent, PortEventHistory
+from .metrics import ClientMetrics
+from .modes import edid_copy_from_output, edid_mode, edid_mode_name
+from .presets import Preset
+from .retry import CircuitBreaker, RetryPolicy
+from .simulator import HDMIMatrixSimulator
+from .state import InputState, MatrixState, OutputState, mode_name
+from .transport import HTTPTransport, TCPTransport, Transport
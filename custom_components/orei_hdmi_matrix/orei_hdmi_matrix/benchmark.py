@@ -0,0 +1,231 @@
+"""Latency and throughput benchmarks of the matrix clients.
+
+Runs against local HDMIMatrixSimulator instances and writes the results as
+JSON, e.g. from custom_components:
+
+    python -m orei_hdmi_matrix.orei_hdmi_matrix.benchmark --hosts 3 --output b.json
+"""
+
+import argparse
+import asyncio
+from contextlib import ExitStack
+import json
+import platform
+import statistics
+import sys
+import time
+
+from .commands import validate_response
+from .orei_hdmi_matrix import AsyncHDMIMatrixAPI, HDMIMatrixAPI, OutputCECCommands
+from .simulator import HDMIMatrixSimulator
+from .transport import TCPTransport
+
+
+def _percentile(samples, q):
+    """Nearest-rank percentile of samples, q in [0, 100]."""
+    ordered = sorted(samples)
+    idx = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def _summary(samples):
+    """Summarize latency samples in milliseconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p99_ms": _percentile(samples, 99) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+def bench_zone_poll(hosts, zones, cycles):
+    """Poll cycle of the sync client read zone by zone, as entities used to."""
+    api = HDMIMatrixAPI()
+    samples = []
+    for _ in range(cycles):
+        api._cache.clear()
+        start = time.perf_counter()
+        for host in hosts:
+            for _ in range(zones):
+                api.get_video_status(host)
+                api.get_output_status(host)
+                api.get_input_status(host)
+        samples.append(time.perf_counter() - start)
+    return _summary(samples)
+
+
+def bench_coordinator_poll(hosts, cycles):
+    """Poll cycle fetching each status document once per host concurrently."""
+
+    async def run():
+        api = AsyncHDMIMatrixAPI()
+        samples = []
+        for _ in range(cycles):
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    getter(host, use_cache=False)
+                    for host in hosts
+                    for getter in (
+                        api.get_video_status,
+                        api.get_output_status,
+                        api.get_input_status,
+                    )
+                )
+            )
+            samples.append(time.perf_counter() - start)
+        await api.close()
+        return samples
+
+    return _summary(asyncio.run(run()))
+
+
+def bench_video_switch(host, count, ports, control_port):
+    """Latency of single video switches with the sync and the async client.
+
+    The async client is measured over HTTP and over the ASCII control port.
+    """
+    api = HDMIMatrixAPI()
+    sync_samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        api.video_switch(host, i % ports + 1, 1)
+        sync_samples.append(time.perf_counter() - start)
+
+    async def run(transport=None):
+        api = AsyncHDMIMatrixAPI()
+        if transport is not None:
+            api.set_transport(host, transport)
+        samples = []
+        for i in range(count):
+            start = time.perf_counter()
+            await api.video_switch(host, i % ports + 1, 1)
+            samples.append(time.perf_counter() - start)
+        await api.close()
+        return samples
+
+    return {
+        "sync": _summary(sync_samples),
+        "async": _summary(asyncio.run(run())),
+        "async_tcp": _summary(asyncio.run(run(TCPTransport(host, control_port)))),
+    }
+
+
+def bench_cec_throughput(host, count, ports):
+    """Back-to-back output CEC commands per second with the async client."""
+
+    async def run():
+        api = AsyncHDMIMatrixAPI()
+        start = time.perf_counter()
+        for i in range(count):
+            await api.output_cec_command(
+                host, i % ports, OutputCECCommands.VOLUME_UP
+            )
+        elapsed = time.perf_counter() - start
+        await api.close()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    return {"count": count, "seconds": elapsed, "commands_per_s": count / elapsed}
+
+
+def bench_cache(host, count):
+    """Cost of serving status documents from the response cache.
+
+    Also measures decoding and validating a status document, the work a
+    cache hit saves.
+    """
+    api = HDMIMatrixAPI()
+    doc = api.get_output_status(host)
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        api.get_output_status(host)
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        json.loads(json.dumps(doc))
+    json_roundtrip = (time.perf_counter() - start) / count
+
+    start = time.perf_counter()
+    for _ in range(count):
+        validate_response("get output status", doc)
+    validate = (time.perf_counter() - start) / count
+
+    return {
+        "hit": _summary(samples),
+        "json_roundtrip_us": json_roundtrip * 1e6,
+        "validate_us": validate * 1e6,
+    }
+
+
+def run_benchmarks(
+    hosts=1, zones=9, cycles=20, count=200, latency=0.002, ports=8
+):
+    """Run all benchmarks against hosts simulated ports x ports matrices."""
+    with ExitStack() as stack:
+        sims = [
+            stack.enter_context(
+                HDMIMatrixSimulator(
+                    inputs=ports, outputs=ports, latency=latency, control_port=0
+                )
+            )
+            for _ in range(hosts)
+        ]
+        addrs = [sim.host for sim in sims]
+        results = {
+            "zone_poll": bench_zone_poll(addrs, zones, cycles),
+            "coordinator_poll": bench_coordinator_poll(addrs, cycles),
+            "video_switch": bench_video_switch(
+                addrs[0], count, ports, sims[0].control_port
+            ),
+            "cec_throughput": bench_cec_throughput(addrs[0], count, ports),
+            "cache": bench_cache(addrs[0], count),
+        }
+        results["device_requests"] = sum(sim.requests for sim in sims)
+
+    return {
+        "params": {
+            "hosts": hosts,
+            "zones": zones,
+            "cycles": cycles,
+            "count": count,
+            "latency_s": latency,
+            "ports": ports,
+        },
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=1)
+    parser.add_argument("--zones", type=int, default=9)
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument(
+        "--latency", type=float, default=0.002, help="simulated device latency (s)"
+    )
+    parser.add_argument(
+        "--ports", type=int, default=8, help="inputs and outputs per matrix"
+    )
+    parser.add_argument("--output", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(
+        args.hosts, args.zones, args.cycles, args.count, args.latency, args.ports
+    )
+    data = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        sys.stdout.write(data + "\n")
+
+
+if __name__ == "__main__":
+    main()
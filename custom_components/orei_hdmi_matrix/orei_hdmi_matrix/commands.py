@@ -0,0 +1,152 @@
+"""Registry of the commands understood by the matrix.
+
+Each entry describes one comhead: how its payload is built, the fields a
+valid response carries, how long a response may be cached, the status
+fields a successful command changes and its form on the ASCII control
+port. Adding a command only takes a new entry.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+# Seconds a cached status response or state stays valid.
+CACHE_TTL = 5
+
+
+@dataclass(frozen=True, slots=True)
+class Command:
+    """Protocol description of one comhead."""
+
+    comhead: str
+    # Payload key the arguments are sent in as a list, if any.
+    key: str | None = None
+    # Builds the payload from the arguments when they are not a plain list.
+    payload: Callable[..., dict] | None = None
+    # Fields a valid response carries besides comhead.
+    fields: tuple[str, ...] = ()
+    # Seconds a response may be served from the cache, 0 for never.
+    ttl: float = 0
+    # Positions of the target port and the new value in the arguments, and
+    # the (status comhead, field, value offset) entries a success changes.
+    target: int = 0
+    value: int = 1
+    patches: tuple[tuple[str, str, int], ...] = ()
+    # Whether the port after the last output targets all outputs at once.
+    all_outputs: bool = False
+    # ASCII form on the control port, formatted with the arguments.
+    ascii: str | None = None
+    _required: frozenset[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_required", frozenset(("comhead", *self.fields)))
+
+    def build(self, *args) -> dict:
+        """Build the command sent for the arguments."""
+        if self.payload is not None:
+            return {"comhead": self.comhead, **self.payload(*args)}
+        if self.key is not None:
+            return {"comhead": self.comhead, self.key: list(args)}
+        return {"comhead": self.comhead}
+
+    def validate(self, resp) -> bool:
+        """Return True if resp is a valid response to the command."""
+        return (
+            isinstance(resp, dict)
+            and resp.get("comhead") == self.comhead
+            and resp.keys() >= self._required
+        )
+
+
+def _cec_payload(obj, port, index):
+    return {"object": obj, "port": port, "index": index}
+
+
+COMMANDS: dict[str, Command] = {
+    command.comhead: command
+    for command in (
+        Command(
+            "get video status",
+            fields=("allsource", "allinputname", "alloutputname"),
+            ttl=CACHE_TTL,
+        ),
+        Command(
+            "get output status",
+            fields=(
+                "power",
+                "allsource",
+                "allscaler",
+                "allout",
+                "allhdbtout",
+                "allconnect",
+                "allhdbtconnect",
+                "allarc",
+                "allhdcp",
+                "name",
+                "hdbtname",
+            ),
+            ttl=CACHE_TTL,
+        ),
+        Command(
+            "get input status",
+            fields=("edid", "inactive", "inname", "power"),
+            ttl=CACHE_TTL,
+        ),
+        Command(
+            "video switch",
+            key="source",
+            target=1,
+            value=0,
+            all_outputs=True,
+            patches=(
+                ("get video status", "allsource", 0),
+                ("get output status", "allsource", 0),
+            ),
+            ascii="s in {0} av out {1}!",
+        ),
+        Command(
+            "video scaler",
+            key="scaler",
+            patches=(("get output status", "allscaler", 0),),
+            ascii="s output {0} scaler {1}!",
+        ),
+        Command(
+            "set arc",
+            key="arc",
+            patches=(("get output status", "allarc", 0),),
+            ascii="s output {0} arc {1}!",
+        ),
+        Command(
+            "tx stream",
+            key="out",
+            patches=(("get output status", "allout", 0),),
+            ascii="s output {0} stream {1}!",
+        ),
+        Command(
+            "set edid",
+            key="edid",
+            # The input status reports EDID modes zero based.
+            patches=(("get input status", "edid", -1),),
+            ascii="s edid in {0} from {1}!",
+        ),
+        Command("cec command", payload=_cec_payload),
+    )
+}
+
+# The status documents a MatrixState is built from, in argument order.
+STATUS_COMHEADS = tuple(c.comhead for c in COMMANDS.values() if c.ttl)
+
+
+def lookup(comhead) -> Command:
+    """Return the entry of comhead, a bare one for unknown comheads."""
+    command = COMMANDS.get(comhead)
+    return command if command is not None else Command(comhead)
+
+
+def build(comhead, *args) -> dict:
+    """Build a command from the registry."""
+    return COMMANDS[comhead].build(*args)
+
+
+def validate_response(comhead, resp) -> bool:
+    """Return True if resp is a valid response to comhead."""
+    return lookup(comhead).validate(resp)
@@ -0,0 +1,147 @@
+"""Several matrices, possibly cascaded, driven as one.
+
+Cascaded matrices feed an output of one unit, usually over HDBaseT, into an
+input of the next. The fleet knows these links and switches every unit on
+the way when a source is routed to a zone of another matrix:
+
+    fleet = HDMIMatrixFleet(AsyncHDMIMatrixAPI())
+    fleet.add_link("10.0.0.2", 8, "10.0.0.3", 1)
+    await fleet.route("10.0.0.2", 3, "10.0.0.3", [1, 2])
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import Iterable
+import logging
+
+from .orei_hdmi_matrix import AsyncHDMIMatrixAPI
+from .state import MatrixState
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class HDMIMatrixFleet:
+    """Poll and route a group of matrices through one client."""
+
+    def __init__(
+        self,
+        api: AsyncHDMIMatrixAPI | None = None,
+        max_concurrency=DEFAULT_MAX_CONCURRENCY,
+    ) -> None:
+        """Initialize the fleet.
+
+        At most max_concurrency matrices are talked to at the same time.
+        """
+        self.api = api or AsyncHDMIMatrixAPI()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._hosts: list[str] = []
+        # (host, output id) -> (host, input id) of the matrix it feeds.
+        self._links: dict[tuple[str, int], tuple[str, int]] = {}
+
+    @property
+    def hosts(self) -> list[str]:
+        """Return the matrices of the fleet."""
+        return list(self._hosts)
+
+    def add_host(self, host):
+        """Add a matrix to the fleet."""
+        if host not in self._hosts:
+            self._hosts.append(host)
+
+    def remove_host(self, host):
+        """Remove a matrix and the links from it.
+
+        Links into the matrix belong to the matrices feeding it and stay.
+        """
+        if host in self._hosts:
+            self._hosts.remove(host)
+        self._links = {src: dst for src, dst in self._links.items() if src[0] != host}
+
+    def add_link(self, host, output_id, to_host, input_id):
+        """Record that an output of host feeds an input of to_host."""
+        self.add_host(host)
+        self.add_host(to_host)
+        self._links[(host, output_id)] = (to_host, input_id)
+
+    def links(self) -> list[tuple[str, int, str, int]]:
+        """Return the links as (host, output id, to host, input id)."""
+        return [(*src, *dst) for src, dst in self._links.items()]
+
+    async def _bounded(self, coro):
+        async with self._semaphore:
+            return await coro
+
+    async def get_state(self, host, use_cache=True) -> MatrixState | None:
+        """Get the state of one matrix, sharing the fleet's concurrency."""
+        return await self._bounded(self.api.get_state(host, use_cache=use_cache))
+
+    async def refresh(self, use_cache=False) -> dict[str, MatrixState | None]:
+        """Fetch the state of all matrices concurrently."""
+        hosts = self.hosts
+        states = await asyncio.gather(
+            *(self.get_state(host, use_cache=use_cache) for host in hosts)
+        )
+        return dict(zip(hosts, states))
+
+    def find_path(self, host, to_host) -> list[tuple[str, int, str, int]] | None:
+        """Return the links leading from host to to_host.
+
+        The path with the fewest hops is returned, an empty list if both
+        are the same matrix and None if to_host cannot be reached.
+        """
+        previous = {host: None}
+        pending = deque([host])
+        while pending:
+            current = pending.popleft()
+            if current == to_host:
+                break
+            for (src, output_id), (dst, input_id) in self._links.items():
+                if src == current and dst not in previous:
+                    previous[dst] = (src, output_id, dst, input_id)
+                    pending.append(dst)
+        if to_host not in previous:
+            return None
+
+        path = []
+        while previous[to_host] is not None:
+            link = previous[to_host]
+            path.append(link)
+            to_host = link[0]
+        path.reverse()
+        return path
+
+    async def route(
+        self, host, input_id, to_host, output_ids: int | Iterable[int]
+    ) -> dict[str, dict[int, int]] | None:
+        """Show an input of host on outputs of to_host.
+
+        The link outputs of every matrix on the way are switched as well,
+        all matrices concurrently. Returns the routes applied per host, or
+        None if to_host cannot be reached or a matrix could not be switched.
+        """
+        if isinstance(output_ids, int):
+            output_ids = (output_ids,)
+        path = self.find_path(host, to_host)
+        if path is None:
+            _LOGGER.warning(f"No cascade link leads from {host} to {to_host}")
+            return None
+
+        routing: dict[str, dict[int, int]] = {}
+        for src, output_id, _, next_input_id in path:
+            routing.setdefault(src, {})[output_id] = input_id
+            input_id = next_input_id
+        for output_id in output_ids:
+            routing.setdefault(to_host, {})[output_id] = input_id
+
+        hosts = list(routing)
+        applied = await asyncio.gather(
+            *(
+                self._bounded(self.api.apply_routing(h, routing[h]))
+                for h in hosts
+            )
+        )
+        if None in applied:
+            return None
+        return dict(zip(hosts, applied))
@@ -0,0 +1,114 @@
+"""Bounded history of port connect and signal transitions.
+
+Every poll is compared with the previous one and the changes are kept in
+fixed size arrays used as a ring buffer, so a flapping HDBaseT link costs
+no more memory than a quiet one:
+
+    history = PortEventHistory()
+    history.observe(state, time.time())
+    history.events()
+"""
+
+from array import array
+from enum import IntEnum
+
+from .state import MatrixState
+
+DEFAULT_HISTORY_SIZE = 256
+
+
+class PortEvent(IntEnum):
+    """Transitions recorded for the ports of a matrix."""
+
+    OUTPUT_CONNECTED = 1
+    OUTPUT_DISCONNECTED = 2
+    HDBT_CONNECTED = 3
+    HDBT_DISCONNECTED = 4
+    INPUT_SIGNAL = 5
+    INPUT_SIGNAL_LOST = 6
+
+
+def _flags(state: MatrixState) -> tuple[bytes, bytes, bytes]:
+    return (
+        bytes(o.connected for o in state.outputs),
+        bytes(o.hdbt_connected for o in state.outputs),
+        bytes(i.active for i in state.inputs),
+    )
+
+
+# Events of each flag group when a port goes up and when it goes down.
+_TRANSITIONS = (
+    (PortEvent.OUTPUT_CONNECTED, PortEvent.OUTPUT_DISCONNECTED),
+    (PortEvent.HDBT_CONNECTED, PortEvent.HDBT_DISCONNECTED),
+    (PortEvent.INPUT_SIGNAL, PortEvent.INPUT_SIGNAL_LOST),
+)
+
+
+class PortEventHistory:
+    """Ring buffer of the latest port events of one matrix."""
+
+    def __init__(self, size=DEFAULT_HISTORY_SIZE) -> None:
+        """Initialize the history, keeping at most size events."""
+        self.size = size
+        self._times = array("d", bytes(8 * size))
+        self._events = array("B", bytes(size))
+        self._ports = array("H", bytes(2 * size))
+        # Slot the next event is written to and the number of events kept.
+        self._next = 0
+        self._count = 0
+        self._flags: tuple[bytes, bytes, bytes] | None = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _append(self, timestamp, event, port_id) -> None:
+        i = self._next
+        self._times[i] = timestamp
+        self._events[i] = event
+        self._ports[i] = port_id
+        self._next = (i + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+
+    def observe(self, state: MatrixState, timestamp: float) -> int:
+        """Record the transitions since the previously observed state.
+
+        The first state only sets the baseline. Returns the number of
+        events recorded.
+        """
+        flags = _flags(state)
+        previous, self._flags = self._flags, flags
+        # The common case of a poll without changes is a bytes comparison.
+        if previous is None or previous == flags:
+            return 0
+
+        recorded = 0
+        for old, new, (up, down) in zip(previous, flags, _TRANSITIONS):
+            if old == new:
+                continue
+            for port_id, (was, now) in enumerate(zip(old, new), 1):
+                if was != now:
+                    self._append(timestamp, up if now else down, port_id)
+                    recorded += 1
+        return recorded
+
+    def events(self, since: float | None = None) -> list[dict]:
+        """Return the kept events, oldest first, optionally after since."""
+        start = (self._next - self._count) % self.size
+        events = []
+        for n in range(self._count):
+            i = (start + n) % self.size
+            if since is not None and self._times[i] <= since:
+                continue
+            event = PortEvent(self._events[i])
+            events.append(
+                {
+                    "time": self._times[i],
+                    "event": event.name.lower(),
+                    "port_id": self._ports[i],
+                }
+            )
+        return events
+
+    def clear(self) -> None:
+        """Forget all events, keeping the baseline."""
+        self._next = self._count = 0
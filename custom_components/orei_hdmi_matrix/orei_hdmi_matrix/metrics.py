@@ -0,0 +1,251 @@
+"""Request counters and latency histograms of the matrix clients."""
+
+from bisect import bisect_left
+from threading import Lock
+
+# Upper bounds of the histogram buckets in milliseconds, the last bucket
+# counts everything slower.
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Bucketed distribution of durations in milliseconds."""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms) -> None:
+        """Add one duration."""
+        self.buckets[bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean duration, or None without samples."""
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q) -> float | None:
+        """Estimate a quantile (0..1) as the upper bound of its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        """Return the histogram as plain data."""
+        return {
+            "count": self.count,
+            "mean_ms": self.mean,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "max_ms": self.max,
+            "buckets": {
+                **{f"le_{bound}": n for bound, n in zip(BUCKETS_MS, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+
+class CommandMetrics:
+    """Counters of one command type sent to one matrix."""
+
+    __slots__ = (
+        "requests",
+        "failures",
+        "retries",
+        "timeouts",
+        "errors",
+        "invalid",
+        "latency",
+    )
+
+    def __init__(self) -> None:
+        # Commands sent and commands that failed after all retries.
+        self.requests = 0
+        self.failures = 0
+        # Attempts after the first, and failed attempts by cause.
+        self.retries = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.invalid = 0
+        # Duration of successful commands including retries.
+        self.latency = Histogram()
+
+    def as_dict(self) -> dict:
+        """Return the counters as plain data."""
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "invalid": self.invalid,
+            "latency": self.latency.as_dict(),
+        }
+
+
+class HostMetrics:
+    """Counters of one matrix."""
+
+    __slots__ = (
+        "commands",
+        "cache_hits",
+        "cache_misses",
+        "coalesced",
+        "merged",
+        "wait",
+    )
+
+    def __init__(self) -> None:
+        self.commands: dict[str, CommandMetrics] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Reads that joined a fetch in flight and queued writes superseded
+        # before being sent.
+        self.coalesced = 0
+        self.merged = 0
+        # Time spent waiting for a contended host lock (sync client) or in
+        # the command queue (async client).
+        self.wait = Histogram()
+
+    def command(self, comhead) -> CommandMetrics:
+        """Return the counters of a command, creating them on first use."""
+        metrics = self.commands.get(comhead)
+        if metrics is None:
+            metrics = self.commands[comhead] = CommandMetrics()
+        return metrics
+
+    def totals(self) -> dict:
+        """Return the counters summed over all commands."""
+        latency = Histogram()
+        totals = {
+            "requests": 0,
+            "failures": 0,
+            "retries": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "invalid": 0,
+        }
+        for metrics in self.commands.values():
+            for key in totals:
+                totals[key] += getattr(metrics, key)
+            latency.count += metrics.latency.count
+            latency.total += metrics.latency.total
+            latency.max = max(latency.max, metrics.latency.max)
+            latency.buckets = [
+                a + b for a, b in zip(latency.buckets, metrics.latency.buckets)
+            ]
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            **totals,
+            "latency": latency.as_dict(),
+            "cache_hit_ratio": self.cache_hits / lookups if lookups else None,
+        }
+
+    def as_dict(self) -> dict:
+        """Return all counters as plain data."""
+        return {
+            "totals": self.totals(),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "coalesced": self.coalesced,
+            "merged": self.merged,
+            "wait": self.wait.as_dict(),
+            "commands": {
+                comhead: metrics.as_dict()
+                for comhead, metrics in sorted(self.commands.items())
+            },
+        }
+
+
+class ClientMetrics:
+    """Per host and per command metrics of a client.
+
+    Updates take a lock, so they can be recorded from several threads.
+    """
+
+    def __init__(self) -> None:
+        self._hosts: dict[str, HostMetrics] = {}
+        self._lock = Lock()
+
+    def _host(self, host) -> HostMetrics:
+        metrics = self._hosts.get(host)
+        if metrics is None:
+            metrics = self._hosts[host] = HostMetrics()
+        return metrics
+
+    def record_command(
+        self, host, comhead, latency_ms, ok, timeouts=0, errors=0, invalid=0
+    ) -> None:
+        """Record a command and the failed attempts it took."""
+        with self._lock:
+            metrics = self._host(host).command(comhead)
+            metrics.requests += 1
+            metrics.timeouts += timeouts
+            metrics.errors += errors
+            metrics.invalid += invalid
+            failed_attempts = timeouts + errors + invalid
+            if ok:
+                metrics.retries += failed_attempts
+                metrics.latency.observe(latency_ms)
+            else:
+                metrics.retries += max(0, failed_attempts - 1)
+                metrics.failures += 1
+
+    def record_cache(self, host, hit) -> None:
+        """Record a cache lookup."""
+        with self._lock:
+            metrics = self._host(host)
+            if hit:
+                metrics.cache_hits += 1
+            else:
+                metrics.cache_misses += 1
+
+    def record_wait(self, host, wait_ms) -> None:
+        """Record the time a command waited before it could be sent."""
+        with self._lock:
+            self._host(host).wait.observe(wait_ms)
+
+    def record_coalesced(self, host) -> None:
+        """Record a read served by a fetch already in flight."""
+        with self._lock:
+            self._host(host).coalesced += 1
+
+    def record_merged(self, host) -> None:
+        """Record a queued write superseded by a later one."""
+        with self._lock:
+            self._host(host).merged += 1
+
+    def hosts(self) -> list[str]:
+        """Return the hosts with recorded metrics."""
+        with self._lock:
+            return list(self._hosts)
+
+    def totals(self, host) -> dict:
+        """Return the counters of host summed over all commands."""
+        with self._lock:
+            return self._host(host).totals()
+
+    def as_dict(self, host=None) -> dict:
+        """Return the metrics of host, or of all hosts, as plain data."""
+        with self._lock:
+            if host is not None:
+                return self._host(host).as_dict()
+            return {h: m.as_dict() for h, m in self._hosts.items()}
+
+    def reset(self) -> None:
+        """Forget all recorded metrics."""
+        with self._lock:
+            self._hosts.clear()
@@ -0,0 +1,149 @@
+from enum import Enum
+
+
+class ScalerModes(Enum):
+    """Enum for setting the scaler mode."""
+
+    BYPASS = 0
+    SCALE_4K_1080P = 1
+    AUTO = 3
+
+
+class OutputCECCommands(Enum):
+    """Enum for sending output a CEC command."""
+
+    POWER_ON = 0
+    POWER_OFF = 1
+    VOLUME_MUTE = 2
+    VOLUME_DOWN = 3
+    VOLUME_UP = 4
+    SOURCE = 5
+
+
+class InputCECCommands(Enum):
+    """Enum for sending input a CEC command."""
+
+    POWER_ON = 1
+    POWER_OFF = 2
+    UP = 3
+    LEFT = 4
+    ENTER = 5
+    RIGHT = 6
+    MENU = 7
+    DOWN = 8
+    BACK = 9
+    PREV = 10
+    PLAY = 11
+    NEXT = 12
+    REWIND = 13
+    PAUSE = 14
+    FAST_FORWARD = 15
+    STOP = 16
+    VOLUME_MUTE = 17
+    VOLUME_DOWN = 18
+    VOLUME_UP = 19
+
+
+class EDIDModes(Enum):
+    """Enum for setting the EDID."""
+
+    # 1080P,Stereo Audio 2.0
+    EDID_1080P_STEREO_AUDIO_2_0 = 1
+    # 1080P,Dolby/DTS 5.1
+    EDID_1080P_DOLBY_DTS_5_1 = 2
+    # 1080P,HD Audio 7.1
+    EDID_1080P_HD_AUDIO_7_1 = 3
+    # 1080I,Stereo Audio 2.0
+    EDID_1080I_STEREO_AUDIO_2_0 = 4
+    # 1080I,Dolby/DTS 5.1
+    EDID_1080I_DOLBY_DTS_5_1 = 5
+    # 1080I,HD Audio 7.1
+    EDID_1080I_HD_AUDIO_7_1 = 6
+    # 3D,Stereo Audio 2.0
+    EDID_3D_STEREO_AUDIO_2_0 = 7
+    # 3D,Dolby/DTS 5.1
+    EDID_3D_DOLBY_DTS_5_1 = 8
+    # 3D,HD Audio 7.1
+    EDID_3D_HD_AUDIO_7_1 = 9
+    # 4K2K30_444,Stereo Audio 2.0
+    EDID_4K2K30_444_STEREO_AUDIO_2_0 = 10
+    # 4K2K30_444,Dolby/DTS 5.1
+    EDID_4K2K30_444_DOLBY_DTS_5_1 = 11
+    # 4K2K30_444,HD Audio 7.1
+    EDID_4K2K30_444_HD_AUDIO_7_1 = 12
+    # 4K2K60_420,Stereo Audio 2.0
+    EDID_4K2K60_420_STEREO_AUDIO_2_0 = 13
+    # 4K2K60_420,Dolby/DTS 5.1
+    EDID_4K2K60_420_DOLBY_DTS_5_1 = 14
+    # 4K2K60_420,HD Audio 7.1
+    EDID_4K2K60_420_HD_AUDIO_7_1 = 15
+    # 4K2K60_444,Stereo Audio 2.0
+    EDID_4K2K60_444_STEREO_AUDIO_2_0 = 16
+    # 4K2K60_444,Dolby/DTS 5.1
+    EDID_4K2K60_444_DOLBY_DTS_5_1 = 17
+    # 4K2K60_444,HD Audio 7.1
+    EDID_4K2K60_444_HD_AUDIO_7_1 = 18
+    # 4K2K60_444,Stereo Audio 2.0 HDR
+    EDID_4K2K60_444_STEREO_AUDIO_2_0_HDR = 19
+    # 4K2K60_444,Dolby/DTS 5.1 HDR
+    EDID_4K2K60_444_DOLBY_DTS_5_1_HDR = 20
+    # 4K2K60_444,HD Audio 7.1 HDR
+    EDID_4K2K60_444_HD_AUDIO_7_1_HDR = 21
+    # User Define1
+    EDID_USER_DEFINE_1 = 22
+    # User Define2
+    EDID_USER_DEFINE_2 = 23
+    # COPY_FROM_OUT_1
+    EDID_COPY_FROM_OUT_1 = 24
+    # COPY_FROM_OUT_2
+    EDID_COPY_FROM_OUT_2 = 25
+    # COPY_FROM_OUT_3
+    EDID_COPY_FROM_OUT_3 = 26
+    # COPY_FROM_OUT_4
+    EDID_COPY_FROM_OUT_4 = 27
+    # COPY_FROM_OUT_5
+    EDID_COPY_FROM_OUT_5 = 28
+    # COPY_FROM_OUT_6
+    EDID_COPY_FROM_OUT_6 = 29
+    # COPY_FROM_OUT_7
+    EDID_COPY_FROM_OUT_7 = 30
+    # COPY_FROM_OUT_8
+    EDID_COPY_FROM_OUT_8 = 31
+
+
+# Matrices with more than eight outputs continue the copy modes past
+# EDID_COPY_FROM_OUT_8.
+EDID_COPY_FROM_OUT = EDIDModes.EDID_COPY_FROM_OUT_1.value
+_COPY_PREFIX = "EDID_COPY_FROM_OUT_"
+
+
+def edid_copy_from_output(output_id) -> EDIDModes | int:
+    """Return the EDID mode copying the EDID of an output (one based)."""
+    if output_id < 1:
+        raise ValueError(f"Invalid output id: {output_id}")
+    value = EDID_COPY_FROM_OUT + output_id - 1
+    try:
+        return EDIDModes(value)
+    except ValueError:
+        return value
+
+
+def edid_mode(name) -> EDIDModes | int:
+    """Look up an EDID mode by name, including the copy mode of any output."""
+    name = str(name).upper()
+    suffix = name.removeprefix(_COPY_PREFIX)
+    if suffix != name and suffix.isdigit():
+        return edid_copy_from_output(int(suffix))
+    try:
+        return EDIDModes[name]
+    except KeyError:
+        raise ValueError(f"Unknown EDID mode: {name}") from None
+
+
+def edid_mode_name(value) -> str:
+    """Return the name of an EDID mode, including copy modes past output 8."""
+    if isinstance(value, EDIDModes):
+        return value.name
+    if value >= EDID_COPY_FROM_OUT:
+        return f"{_COPY_PREFIX}{value - EDID_COPY_FROM_OUT + 1}"
+    return str(value)
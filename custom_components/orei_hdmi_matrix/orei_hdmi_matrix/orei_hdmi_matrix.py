@@ -1,294 +1,1002 @@
-from collections.abc import Mapping
-from enum import Enum
+import asyncio
+from collections.abc import Callable, Iterable, Mapping
+import http.client
 import json
 import logging
-from threading import RLock
+from threading import Event, RLock
 import time
 import urllib.request
 
+from .commands import CACHE_TTL, STATUS_COMHEADS, build, lookup, validate_response
+from .metrics import ClientMetrics
+from .modes import EDIDModes, InputCECCommands, OutputCECCommands, ScalerModes
+from .presets import Preset
+from .retry import CircuitBreaker, RetryPolicy
+from .state import MatrixState, mode_value
+from .transport import HTTPTransport, Transport
+
 _LOGGER = logging.getLogger(__name__)
 
+# Cache key of the parsed MatrixState of a host.
+_STATE = "matrix state"
+
+
+def _output_count(statuses):
+    """Return the number of outputs told by status documents, if any."""
+    sources = statuses.get("get output status", {}).get("allsource")
+    if isinstance(sources, list):
+        return len(sources)
+    # The video status also reports the source of the All Outputs zone.
+    sources = statuses.get("get video status", {}).get("allsource")
+    if isinstance(sources, list):
+        return len(sources) - 1
+    return None
+
+
+def patch_status(statuses, cmd):
+    """Apply a successful control command to parsed status documents.
+
+    statuses maps status comheads to their documents, which are updated in
+    place. Returns the comheads of documents that could not be patched and
+    need to be fetched again.
+    """
+    command = lookup(cmd["comhead"])
+    if not command.patches:
+        return set()
+    target = cmd[command.key][command.target]
+    value = cmd[command.key][command.value]
+    outputs = _output_count(statuses)
+    all_outputs = command.all_outputs and outputs is not None and target == outputs + 1
+
+    stale = set()
+    for status_comhead, field, offset in command.patches:
+        status = statuses.get(status_comhead)
+        if status is None:
+            continue
+        values = status.get(field)
+        if all_outputs and isinstance(values, list):
+            values[:] = [value + offset] * len(values)
+            continue
+        if not isinstance(values, list) or not 1 <= target <= len(values):
+            stale.add(status_comhead)
+            continue
+        values[target - 1] = value + offset
+    return stale
+
+
+def _repeatable(cmd) -> bool:
+    """Return True if a command may be sent again after a failed attempt.
+
+    Status reads and settings may, but commands like CEC key presses may
+    already have run on the matrix.
+    """
+    command = lookup(cmd["comhead"])
+    return bool(command.ttl or command.patches)
+
+
+def _merge_key(cmd):
+    """Return the setting a control command overwrites.
+
+    Queued commands with the same key supersede each other. Returns None
+    for commands that must all be sent, like CEC key presses.
+    """
+    command = lookup(cmd["comhead"])
+    if not command.patches:
+        return None
+    return cmd["comhead"], cmd[command.key][command.target]
+
+
+def _is_timeout(error):
+    # urllib wraps socket timeouts in URLError.
+    return isinstance(error, TimeoutError) or isinstance(
+        getattr(error, "reason", None), TimeoutError
+    )
+
+
+class _FailedAttempts:
+    """Failed attempts of one command by cause, for the metrics."""
+
+    __slots__ = ("timeouts", "errors", "invalid")
 
-class ScalerModes(Enum):
-    """Enum for setting the scaler mode."""
-
-    BYPASS = 0
-    SCALE_4K_1080P = 1
-    AUTO = 3
-
-
-class OutputCECCommands(Enum):
-    """Enum for sending output a CEC command."""
-
-    POWER_ON = 0
-    POWER_OFF = 1
-    VOLUME_MUTE = 2
-    VOLUME_DOWN = 3
-    VOLUME_UP = 4
-    SOURCE = 5
-
-
-class InputCECCommands(Enum):
-    """Enum for sending input a CEC command."""
-
-    POWER_ON = 1
-    POWER_OFF = 2
-    UP = 3
-    LEFT = 4
-    ENTER = 5
-    RIGHT = 6
-    MENU = 7
-    DOWN = 8
-    BACK = 9
-    PREV = 10
-    PLAY = 11
-    NEXT = 12
-    REWIND = 13
-    PAUSE = 14
-    FAST_FORWARD = 15
-    STOP = 16
-    VOLUME_MUTE = 17
-    VOLUME_DOWN = 18
-    VOLUME_UP = 19
-
-
-class EDIDModes(Enum):
-    """Enum for setting the EDID."""
-
-    # 1080P,Stereo Audio 2.0
-    EDID_1080P_STEREO_AUDIO_2_0 = 1
-    # 1080P,Dolby/DTS 5.1
-    EDID_1080P_DOLBY_DTS_5_1 = 2
-    # 1080P,HD Audio 7.1
-    EDID_1080P_HD_AUDIO_7_1 = 3
-    # 1080I,Stereo Audio 2.0
-    EDID_1080I_STEREO_AUDIO_2_0 = 4
-    # 1080I,Dolby/DTS 5.1
-    EDID_1080I_DOLBY_DTS_5_1 = 5
-    # 1080I,HD Audio 7.1
-    EDID_1080I_HD_AUDIO_7_1 = 6
-    # 3D,Stereo Audio 2.0
-    EDID_3D_STEREO_AUDIO_2_0 = 7
-    # 3D,Dolby/DTS 5.1
-    EDID_3D_DOLBY_DTS_5_1 = 8
-    # 3D,HD Audio 7.1
-    EDID_3D_HD_AUDIO_7_1 = 9
-    # 4K2K30_444,Stereo Audio 2.0
-    EDID_4K2K30_444_STEREO_AUDIO_2_0 = 10
-    # 4K2K30_444,Dolby/DTS 5.1
-    EDID_4K2K30_444_DOLBY_DTS_5_1 = 11
-    # 4K2K30_444,HD Audio 7.1
-    EDID_4K2K30_444_HD_AUDIO_7_1 = 12
-    # 4K2K60_420,Stereo Audio 2.0
-    EDID_4K2K60_420_STEREO_AUDIO_2_0 = 13
-    # 4K2K60_420,Dolby/DTS 5.1
-    EDID_4K2K60_420_DOLBY_DTS_5_1 = 14
-    # 4K2K60_420,HD Audio 7.1
-    EDID_4K2K60_420_HD_AUDIO_7_1 = 15
-    # 4K2K60_444,Stereo Audio 2.0
-    EDID_4K2K60_444_STEREO_AUDIO_2_0 = 16
-    # 4K2K60_444,Dolby/DTS 5.1
-    EDID_4K2K60_444_DOLBY_DTS_5_1 = 17
-    # 4K2K60_444,HD Audio 7.1
-    EDID_4K2K60_444_HD_AUDIO_7_1 = 18
-    # 4K2K60_444,Stereo Audio 2.0 HDR
-    EDID_4K2K60_444_STEREO_AUDIO_2_0_HDR = 19
-    # 4K2K60_444,Dolby/DTS 5.1 HDR
-    EDID_4K2K60_444_DOLBY_DTS_5_1_HDR = 20
-    # 4K2K60_444,HD Audio 7.1 HDR
-    EDID_4K2K60_444_HD_AUDIO_7_1_HDR = 21
-    # User Define1
-    EDID_USER_DEFINE_1 = 22
-    # User Define2
-    EDID_USER_DEFINE_2 = 23
-    # COPY_FROM_OUT_1
-    EDID_COPY_FROM_OUT_1 = 24
-    # COPY_FROM_OUT_2
-    EDID_COPY_FROM_OUT_2 = 25
-    # COPY_FROM_OUT_3
-    EDID_COPY_FROM_OUT_3 = 26
-    # COPY_FROM_OUT_4
-    EDID_COPY_FROM_OUT_4 = 27
-    # COPY_FROM_OUT_5
-    EDID_COPY_FROM_OUT_5 = 28
-    # COPY_FROM_OUT_6
-    EDID_COPY_FROM_OUT_6 = 29
-    # COPY_FROM_OUT_7
-    EDID_COPY_FROM_OUT_7 = 30
-    # COPY_FROM_OUT_8
-    EDID_COPY_FROM_OUT_8 = 31
-
-
-class HDMIMatrixAPI:
-    """HDMI Matrix API abstration."""
+    def __init__(self) -> None:
+        self.timeouts = self.errors = self.invalid = 0
+
+    def add(self, error) -> None:
+        if error is None:
+            self.invalid += 1
+        elif _is_timeout(error):
+            self.timeouts += 1
+        else:
+            self.errors += 1
+
+    def record(self, metrics, host, comhead, start, resp, clock=time.monotonic):
+        metrics.record_command(
+            host,
+            comhead,
+            (clock() - start) * 1000,
+            bool(resp),
+            self.timeouts,
+            self.errors,
+            self.invalid,
+        )
+
+
+def _port_mask(port_ids, size):
+    """Build the CEC port bitmask for one or several zero based port ids."""
+    if isinstance(port_ids, int):
+        port_ids = (port_ids,)
+    ports = set(port_ids)
+    return [1 if i in ports else 0 for i in range(size)]
+
+
+def _routing_cmds(current, routing):
+    """Build the video switch commands for routes differing from current.
+
+    current ends with the All Outputs zone, which is always switched as its
+    source says nothing about the other outputs.
+    """
+    return [
+        build("video switch", input_id, output_id)
+        for output_id, input_id in routing.items()
+        if not (1 <= output_id < len(current) and current[output_id - 1] == input_id)
+    ]
+
+
+class _HDMIMatrixAPIBase:
+    """Response cache, retry policies and circuit breakers of the clients."""
+
+    def __init__(self, retry_policy: RetryPolicy | None = None) -> None:
+        # Parsed status documents and MatrixState objects keyed by
+        # (host, comhead), shared with callers so treat them as read-only.
+        self._cache: dict[tuple[str, str], tuple[float, object]] = {}
+        self._default_policy = retry_policy or RetryPolicy()
+        self._policies: dict[str, RetryPolicy] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        # (inputs, outputs) of each host, discovered from its status.
+        self._port_counts: dict[str, tuple[int, int]] = {}
+        self.metrics = ClientMetrics()
+
+    def _cache_get(self, cache_key):
+        cached = self._cache.get(cache_key, None)
+        if cached:
+            (expires, data) = cached
+            if time.time() < expires:
+                _LOGGER.debug(f"Cache Hit: '{cache_key}'")
+                self.metrics.record_cache(cache_key[0], True)
+                return data
+            del self._cache[cache_key]
+
+        _LOGGER.debug(f"Cache miss: '{cache_key}'")
+        self.metrics.record_cache(cache_key[0], False)
+        return None
+
+    def _cache_put(self, cache_key, data, ttl=CACHE_TTL):
+        self._cache[cache_key] = (time.time() + ttl, data)
+
+    def _put_state(self, host, state: MatrixState):
+        self._cache_put((host, _STATE), state)
+        self._port_counts[host] = (len(state.inputs), len(state.outputs))
+
+    def _patch_cache(self, host, cmd):
+        """Write a successful control command through to the cache."""
+        command = lookup(cmd["comhead"])
+        if not command.patches:
+            return
+        statuses = {}
+        for status_comhead, _, _ in command.patches:
+            cached = self._cache.get((host, status_comhead), None)
+            if cached:
+                statuses[status_comhead] = cached[1]
+
+        stale = patch_status(statuses, cmd)
+        for status_comhead in stale:
+            _LOGGER.debug(f"Cache invalidate: '{(host, status_comhead)}'")
+            self._cache.pop((host, status_comhead), None)
+
+        cached = self._cache.get((host, _STATE), None)
+        if cached and not cached[1].apply(cmd):
+            _LOGGER.debug(f"Cache invalidate: '{(host, _STATE)}'")
+            del self._cache[(host, _STATE)]
+
+    def set_retry_policy(self, host, policy: RetryPolicy):
+        """Set the retry policy used for commands to host."""
+        self._policies[host] = policy
+        self._breakers.pop(host, None)
+
+    def circuit_open(self, host) -> bool:
+        """Return True while commands to host fail fast."""
+        breaker = self._breakers.get(host)
+        return breaker is not None and breaker.is_open
+
+    def _policy(self, host) -> RetryPolicy:
+        return self._policies.get(host, self._default_policy)
+
+    def _breaker(self, host) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            policy = self._policy(host)
+            breaker = self._breakers[host] = CircuitBreaker(
+                policy.failure_threshold, policy.reset_timeout
+            )
+        return breaker
+
+    def _record_result(self, host, resp_data) -> bool:
+        """Update the circuit of host, return True if it just opened."""
+        breaker = self._breaker(host)
+        if resp_data:
+            breaker.record_success()
+            return False
+        if breaker.record_failure():
+            _LOGGER.warning(f"HDMI Matrix at '{host}' is unreachable, failing fast")
+            return True
+        return False
+
+
+class _TimedLock:
+    """Reentrant host lock recording how long threads wait for it."""
+
+    __slots__ = ("_host", "_lock", "_metrics")
+
+    def __init__(self, host, metrics: ClientMetrics) -> None:
+        self._host = host
+        self._lock = RLock()
+        self._metrics = metrics
+
+    def __enter__(self):
+        if not self._lock.acquire(blocking=False):
+            start = time.monotonic()
+            self._lock.acquire()
+            self._metrics.record_wait(self._host, (time.monotonic() - start) * 1000)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+class _Flight:
+    """A status read in progress that other threads can wait for."""
+
+    __slots__ = ("done", "result")
 
     def __init__(self) -> None:
+        self.done = Event()
+        self.result = None
+
+
+class HDMIMatrixAPI(_HDMIMatrixAPIBase):
+    """HDMI Matrix API abstration."""
+
+    def __init__(self, retry_policy: RetryPolicy | None = None) -> None:
         """Initialize the API."""
+        super().__init__(retry_policy)
+        # Only guards creation of the per-host locks so commands to
+        # different matrices never wait on each other.
         self._lock = RLock()
-        self._cache: Mapping[str, (int, str)] = {}
+        self._host_locks: dict[str, _TimedLock] = {}
+        # Status reads in progress keyed by (host, comhead).
+        self._flights: dict[tuple[str, str], _Flight] = {}
+
+    def _host_lock(self, host) -> _TimedLock:
+        with self._lock:
+            lock = self._host_locks.get(host)
+            if lock is None:
+                lock = self._host_locks[host] = _TimedLock(host, self.metrics)
+            return lock
+
+    def _single_flight(self, key, fetch):
+        """Share the result of fetch() between threads asking for key.
+
+        Must not be called while holding a host lock, the thread running
+        fetch() may be waiting for it.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            self.metrics.record_coalesced(key[0])
+            flight.done.wait()
+            return flight.result
+        try:
+            flight.result = fetch()
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def _get_status(self, host, comhead):
+        def fetch():
+            with self._host_lock(host):
+                return self._hdmi_matrix_cmd(host, build(comhead), use_cache=True)
+
+        return self._single_flight((host, comhead), fetch)
 
     def _hdmi_matrix_cmd(self, host, cmd, use_cache=False):
-        #cmd["language"] = 0
-        cache_key = cmd["comhead"]
+        command = lookup(cmd["comhead"])
+        cache_key = (host, cmd["comhead"])
 
-        if use_cache:
-            cached = self._cache.get(cache_key, None)
-            if cached:
-                (ts, data) = cached
-                if time.time() - ts < 5:
-                    _LOGGER.debug(f"Cache Hit: '{cache_key}'")
-                    return json.loads(data)
-                del self._cache[cache_key]
+        if use_cache and command.ttl:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
 
-            _LOGGER.debug(f"Cache miss: '{cache_key}'")
+        if not self._breaker(host).allow():
+            _LOGGER.debug(f"Circuit open for '{host}', skipping '{cmd['comhead']}'")
+            return None
 
+        policy = self._policy(host)
+        start = time.monotonic()
         resp_data = None
-        for retry_count in range(5):
+        failed = _FailedAttempts()
+        attempts = policy.attempts if _repeatable(cmd) else 1
+        for attempt in range(attempts):
+            remaining = policy.deadline - (time.monotonic() - start)
             req = urllib.request.Request(
                 f"http://{host}/cgi-bin/instr",
                 data=json.dumps(cmd).encode("utf-8"),
                 headers={"Accept": "application/json"},
                 method="POST",
             )
+            error = None
             try:
-                with urllib.request.urlopen(req, timeout=5) as r:
+                timeout = min(policy.timeout(cmd["comhead"]), remaining)
+                with urllib.request.urlopen(req, timeout=timeout) as r:
                     if r.getcode() == 200:
                         resp_data = json.load(r)
-                        _LOGGER.error(resp_data)
+                        _LOGGER.debug(resp_data)
             except Exception as e:
                 _LOGGER.error(f"Error connecting to the HDMI Matrix: {e}")
+                error = e
 
-            if not self._validate_comhead_response(cmd["comhead"], resp_data):
+            if not command.validate(resp_data):
                 _LOGGER.error(
                     f"Invalid data from device for cmd: '{cmd}': '{resp_data}'"
                 )
+                failed.add(error)
                 resp_data = None
 
             if resp_data:
                 break
-            time.sleep(1)
+            delay = policy.delay(attempt)
+            if (
+                attempt + 1 == attempts
+                or time.monotonic() - start + delay >= policy.deadline
+            ):
+                break
+            time.sleep(delay)
 
-        if resp_data and use_cache:
-            self._cache[cache_key] = (time.time(), json.dumps(resp_data))
+        self._record_result(host, resp_data)
+        failed.record(self.metrics, host, cmd["comhead"], start, resp_data)
+
+        # Status reads always refresh the cache, use_cache only decides
+        # whether a cached response may be returned.
+        if resp_data and command.ttl:
+            self._cache_put(cache_key, resp_data, command.ttl)
+        elif resp_data:
+            self._patch_cache(host, cmd)
 
         return resp_data
 
-    def _validate_comhead_response(self, comhead, resp):
-        valid = "comhead" in resp and resp["comhead"] == comhead
-        if not resp:
-            return False
-        if comhead == "get video status":
-            for field in ["allsource", "allinputname", "alloutputname"]:
-                valid &= field in resp
-        elif comhead == "get output status":
-            for field in [
-                "power",
-                "allsource",
-                "allscaler",
-                "allout",
-                "allhdbtout",
-                "allconnect",
-                "allhdbtconnect",
-                "name",
-                "hdbtname",
-            ]:
-                valid &= field in resp
-        elif comhead == "get input status":
-            for field in ["edid", "inactive", "inname", "power"]:
-                valid &= field in resp
-
-        return valid
+    def _hdmi_matrix_cmds(self, host, cmds):
+        """Send several control commands over one keep-alive connection.
+
+        Setting commands that fail on that connection are retried one by
+        one, others are reported as failed. Returns the responses in command
+        order.
+        """
+        with self._host_lock(host):
+            if not self._breaker(host).allow():
+                _LOGGER.debug(
+                    f"Circuit open for '{host}', skipping {len(cmds)} commands"
+                )
+                return [None] * len(cmds)
+
+            resps = []
+            start = time.monotonic()
+            conn = http.client.HTTPConnection(
+                host, timeout=self._policy(host).write_timeout
+            )
+            try:
+                for cmd in cmds:
+                    conn.request(
+                        "POST",
+                        "/cgi-bin/instr",
+                        body=json.dumps(cmd).encode("utf-8"),
+                        headers={
+                            "Accept": "application/json",
+                            "Content-Type": "application/json",
+                        },
+                    )
+                    with conn.getresponse() as r:
+                        data = r.read()
+                        resps.append(json.loads(data) if r.status == 200 else None)
+            except Exception as e:
+                _LOGGER.error(f"Error connecting to the HDMI Matrix: {e}")
+            finally:
+                conn.close()
+
+            resps += [None] * (len(cmds) - len(resps))
+            elapsed_ms = (time.monotonic() - start) * 1000
+            for i, cmd in enumerate(cmds):
+                if validate_response(cmd["comhead"], resps[i]):
+                    self.metrics.record_command(host, cmd["comhead"], elapsed_ms, True)
+                    self._record_result(host, resps[i])
+                    self._patch_cache(host, cmd)
+                elif _repeatable(cmd):
+                    resps[i] = self._hdmi_matrix_cmd(host, cmd)
+                else:
+                    resps[i] = None
+                    self.metrics.record_command(
+                        host, cmd["comhead"], elapsed_ms, False, invalid=1
+                    )
+            return resps
 
     def get_video_status(self, host):
         """Get the video status."""
-        with self._lock:
-            return self._hdmi_matrix_cmd(
-                host, {"comhead": "get video status"}, use_cache=True
-            )
+        return self._get_status(host, "get video status")
 
     def get_output_status(self, host):
         """Get the output status."""
-        with self._lock:
-            return self._hdmi_matrix_cmd(
-                host, {"comhead": "get output status"}, use_cache=True
-            )
+        return self._get_status(host, "get output status")
 
     def get_input_status(self, host):
         """Get the input status."""
-        with self._lock:
-            return self._hdmi_matrix_cmd(
-                host, {"comhead": "get input status"}, use_cache=True
-            )
+        return self._get_status(host, "get input status")
+
+    def get_state(self, host, use_cache=True) -> MatrixState | None:
+        """Get the parsed state built from the three status documents.
+
+        Concurrent callers share one fetch and the resulting state.
+        """
+
+        def fetch():
+            with self._host_lock(host):
+                return self._fetch_state(host, use_cache)
+
+        return self._single_flight((host, _STATE), fetch)
+
+    def _fetch_state(self, host, use_cache):
+        with self._host_lock(host):
+            if use_cache:
+                state = self._cache_get((host, _STATE))
+                if state is not None:
+                    return state
+
+            statuses = [
+                self._hdmi_matrix_cmd(host, build(comhead), use_cache=use_cache)
+                for comhead in STATUS_COMHEADS
+            ]
+            if None in statuses:
+                return None
+            state = MatrixState.from_status(*statuses)
+            self._put_state(host, state)
+            return state
 
     def video_switch(self, host, input_id, output_id):
         """Switch video source."""
-        with self._lock:
+        with self._host_lock(host):
             return self._hdmi_matrix_cmd(
-                host,
-                {"comhead": "video switch", "source": [input_id, output_id]},
-                use_cache=False,
+                host, build("video switch", input_id, output_id)
             )
 
+    def apply_routing(self, host, routing: Mapping[int, int]):
+        """Switch several outputs in one go.
+
+        routing maps output ids to input ids. Routes that already match the
+        routing read from the matrix are skipped and the rest are sent over
+        a single connection. Returns the routes that were applied, or None
+        if the current routing could not be read.
+        """
+        with self._host_lock(host):
+            video_status = self._hdmi_matrix_cmd(host, build("get video status"))
+            if video_status is None:
+                return None
+            cmds = _routing_cmds(video_status["allsource"], routing)
+            resps = self._hdmi_matrix_cmds(host, cmds) if cmds else []
+            return {
+                cmd["source"][1]: cmd["source"][0]
+                for cmd, resp in zip(cmds, resps)
+                if resp
+            }
+
+    def apply_preset(self, host, preset: Preset):
+        """Recall a preset, sending only the settings that differ.
+
+        The preset is compared with the cached state and the commands
+        needed are sent over a single connection. Returns the commands that
+        were applied, or None if the current state could not be read.
+        """
+        with self._host_lock(host):
+            state = self._fetch_state(host, True)
+            if state is None:
+                return None
+            cmds = preset.commands(state)
+            resps = self._hdmi_matrix_cmds(host, cmds) if cmds else []
+            return [cmd for cmd, resp in zip(cmds, resps) if resp]
+
     def tx_stream(self, host, output_id, on_state):
         """Tx Stream switch."""
-        with self._lock:
+        with self._host_lock(host):
             return self._hdmi_matrix_cmd(
-                host,
-                {"comhead": "tx stream", "out": [output_id, int(on_state)]},
-                use_cache=False,
+                host, build("tx stream", output_id, int(on_state))
             )
 
     def set_arc(self, host, output_id, on_state):
         """Set ARC on output."""
-        with self._lock:
+        with self._host_lock(host):
             return self._hdmi_matrix_cmd(
-                host,
-                {"comhead": "set arc", "arc": [output_id, int(on_state)]},
-                use_cache=False,
+                host, build("set arc", output_id, int(on_state))
             )
 
     def video_scaler(self, host, output_id, scaler_mode: ScalerModes):
         """Set video scaler."""
-        with self._lock:
+        with self._host_lock(host):
             return self._hdmi_matrix_cmd(
-                host,
-                {"comhead": "video scaler", "scaler": [output_id, scaler_mode.value]},
-                use_cache=False,
+                host, build("video scaler", output_id, scaler_mode.value)
             )
 
-    def set_input_edid(self, host, input_id, edid_mode: EDIDModes):
+    def set_input_edid(self, host, input_id, edid_mode: EDIDModes | int):
         """Set input EDID."""
-        with self._lock:
+        with self._host_lock(host):
             return self._hdmi_matrix_cmd(
-                host,
-                {"comhead": "set edid", "edid": [input_id, edid_mode.value]},
-                use_cache=False,
+                host, build("set edid", input_id, mode_value(edid_mode))
             )
 
-    def output_cec_command(self, host, output_id, cmd: OutputCECCommands):
-        """Send output a CEC command"""
-        with self._lock:
+    def port_counts(self, host) -> tuple[int, int] | None:
+        """Return the number of inputs and outputs of host.
+
+        The counts are read from the status of the matrix the first time
+        they are needed.
+        """
+        with self._host_lock(host):
+            if host not in self._port_counts and self._fetch_state(host, True) is None:
+                return None
+            return self._port_counts[host]
+
+    def output_cec_command(
+        self, host, output_id: int | Iterable[int], cmd: OutputCECCommands
+    ):
+        """Send a CEC command to one or several outputs (zero based ids)."""
+        with self._host_lock(host):
+            counts = self.port_counts(host)
+            if counts is None:
+                return None
             return self._hdmi_matrix_cmd(
                 host,
-                {
-                    "comhead": "cec command",
-                    "object": 1,
-                    "port": [1 if i == output_id else 0 for i in range(8)],
-                    "index": cmd.value,
-                },
-                use_cache=False,
+                build("cec command", 1, _port_mask(output_id, counts[1]), cmd.value),
             )
 
-    def input_cec_command(self, host, input_id, cmd: InputCECCommands):
-        """Send output a CEC command"""
-        with self._lock:
+    def input_cec_command(
+        self, host, input_id: int | Iterable[int], cmd: InputCECCommands
+    ):
+        """Send a CEC command to one or several inputs (zero based ids)."""
+        with self._host_lock(host):
+            counts = self.port_counts(host)
+            if counts is None:
+                return None
             return self._hdmi_matrix_cmd(
                 host,
-                {
-                    "comhead": "cec command",
-                    "object": 0,
-                    "port": [1 if i == input_id else 0 for i in range(8)],
-                    "index": cmd.value,
-                },
-                use_cache=False,
+                build("cec command", 0, _port_mask(input_id, counts[0]), cmd.value),
+            )
+
+
+class AsyncHDMIMatrixAPI(_HDMIMatrixAPIBase):
+    """Asyncio HDMI Matrix API abstraction over persistent connections."""
+
+    def __init__(self, pool_size=2, retry_policy: RetryPolicy | None = None) -> None:
+        """Initialize the API.
+
+        Commands go over HTTP with up to pool_size connections per matrix
+        unless another transport is set for it.
+        """
+        super().__init__(retry_policy)
+        self._probes: dict[str, asyncio.Task] = {}
+        self._pool_size = pool_size
+        self._transports: dict[str, Transport] = {}
+        self._listeners: dict[str, list[Callable[[list[dict]], None]]] = {}
+        # Status reads in progress keyed by (host, comhead).
+        self._flights: dict[tuple[str, str], asyncio.Future] = {}
+        # Control commands waiting to be sent, the futures of their callers
+        # and the time they were queued, per host.
+        self._queues: dict[
+            str, list[tuple[dict, list[asyncio.Future], float]]
+        ] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+
+    def add_command_listener(self, host, listener: Callable[[list[dict]], None]):
+        """Call listener with the control commands that succeed on host.
+
+        Commands sent together, e.g. by apply_routing, are passed in a single
+        call. Returns a function that removes the listener again.
+        """
+        listeners = self._listeners.setdefault(host, [])
+        listeners.append(listener)
+        return lambda: listeners.remove(listener)
+
+    def set_transport(self, host, transport: Transport | None):
+        """Send the commands to host through transport, None restores HTTP.
+
+        The previous transport of host is not closed.
+        """
+        if transport is None:
+            self._transports.pop(host, None)
+        else:
+            self._transports[host] = transport
+
+    def _transport(self, host) -> Transport:
+        transport = self._transports.get(host)
+        if transport is None:
+            transport = self._transports[host] = HTTPTransport(host, self._pool_size)
+        return transport
+
+    async def _single_flight(self, key, fetch):
+        """Share the result of fetch() between concurrent callers of key."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = asyncio.ensure_future(fetch())
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.metrics.record_coalesced(key[0])
+        # A cancelled caller must not cancel the request of the others.
+        return await asyncio.shield(flight)
+
+    async def _hdmi_matrix_cmd(self, host, cmd, use_cache=False, notify=True):
+        command = lookup(cmd["comhead"])
+        cache_key = (host, cmd["comhead"])
+
+        if use_cache and command.ttl:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+        # Cacheable reads are shared between concurrent callers.
+        if command.ttl:
+            return await self._single_flight(
+                cache_key, lambda: self._send_cmd(host, cmd, notify)
+            )
+        return await self._send_cmd(host, cmd, notify)
+
+    async def _send_cmd(self, host, cmd, notify):
+        """Send a command with retries and update the cache."""
+        command = lookup(cmd["comhead"])
+        cache_key = (host, cmd["comhead"])
+        if not self._breaker(host).allow():
+            _LOGGER.debug(f"Circuit open for '{host}', skipping '{cmd['comhead']}'")
+            return None
+
+        policy = self._policy(host)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        resp_data = None
+        failed = _FailedAttempts()
+        attempts = policy.attempts if _repeatable(cmd) else 1
+        for attempt in range(attempts):
+            remaining = policy.deadline - (loop.time() - start)
+            error = None
+            try:
+                resp_data = await self._transport(host).send(
+                    cmd, min(policy.timeout(cmd["comhead"]), remaining)
+                )
+                _LOGGER.debug(resp_data)
+            except Exception as e:
+                _LOGGER.error(f"Error connecting to the HDMI Matrix: {e!r}")
+                error = e
+
+            if not command.validate(resp_data):
+                _LOGGER.error(
+                    f"Invalid data from device for cmd: '{cmd}': '{resp_data}'"
+                )
+                failed.add(error)
+                resp_data = None
+
+            if resp_data:
+                break
+            delay = policy.delay(attempt)
+            if (
+                attempt + 1 == attempts
+                or loop.time() - start + delay >= policy.deadline
+            ):
+                break
+            await asyncio.sleep(delay)
+
+        failed.record(self.metrics, host, cmd["comhead"], start, resp_data, loop.time)
+        if self._record_result(host, resp_data) and host not in self._probes:
+            self._probes[host] = asyncio.create_task(self._probe(host))
+
+        if resp_data and command.ttl:
+            self._cache_put(cache_key, resp_data, command.ttl)
+        elif resp_data and notify:
+            self._commands_done(host, [cmd])
+
+        return resp_data
+
+    async def _hdmi_matrix_cmds(self, host, cmds):
+        """Send several control commands pipelined over one connection.
+
+        Setting commands that fail in the pipeline are retried one by one.
+        Others, like CEC key presses, may already have run on the matrix and
+        are reported as failed instead, as in _hdmi_matrix_cmd. Returns the
+        responses in command order.
+        """
+        if not self._breaker(host).allow():
+            _LOGGER.debug(f"Circuit open for '{host}', skipping {len(cmds)} commands")
+            return [None] * len(cmds)
+
+        policy = self._policy(host)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        resps = [None] * len(cmds)
+        failed = _FailedAttempts()
+        try:
+            resps = await self._transport(host).send_many(
+                cmds, min(policy.write_timeout * len(cmds), policy.deadline)
+            )
+        except Exception as e:
+            _LOGGER.error(f"Error connecting to the HDMI Matrix: {e!r}")
+            failed.add(e)
+
+        # Pipelined commands are only complete once the whole batch is.
+        elapsed_ms = (loop.time() - start) * 1000
+        for i, cmd in enumerate(cmds):
+            if validate_response(cmd["comhead"], resps[i]):
+                self.metrics.record_command(host, cmd["comhead"], elapsed_ms, True)
+            elif _repeatable(cmd):
+                resps[i] = await self._hdmi_matrix_cmd(host, cmd, notify=False)
+            else:
+                resps[i] = None
+                if not (failed.timeouts or failed.errors):
+                    failed.invalid = 1
+                self.metrics.record_command(
+                    host,
+                    cmd["comhead"],
+                    elapsed_ms,
+                    False,
+                    failed.timeouts,
+                    failed.errors,
+                    failed.invalid,
+                )
+        if any(resps):
+            self._record_result(host, True)
+        elif not any(_repeatable(cmd) for cmd in cmds):
+            # No retry recorded the failure with the circuit.
+            self._record_result(host, None)
+
+        self._commands_done(host, [cmd for cmd, resp in zip(cmds, resps) if resp])
+        return resps
+
+    async def _queue_cmd(self, host, cmd):
+        """Queue a control command and wait for its response.
+
+        A queued command replaces an earlier one to the same setting that
+        has not been sent yet, and the callers of both get the response of
+        the later one. Everything queued while a batch is being sent goes
+        out pipelined, in order, in the next batch.
+        """
+        queue = self._queues.setdefault(host, [])
+        loop = asyncio.get_running_loop()
+        waiters = []
+        queued_at = loop.time()
+        key = _merge_key(cmd)
+        if key is not None:
+            for i, (queued, queued_waiters, first_queued_at) in enumerate(queue):
+                if _merge_key(queued) == key:
+                    _LOGGER.debug(f"Command '{queued}' superseded by '{cmd}'")
+                    self.metrics.record_merged(host)
+                    waiters = queued_waiters
+                    queued_at = first_queued_at
+                    del queue[i]
+                    break
+        future = loop.create_future()
+        waiters.append(future)
+        queue.append((cmd, waiters, queued_at))
+        if host not in self._workers:
+            self._workers[host] = asyncio.create_task(self._send_queued(host))
+        return await future
+
+    async def _send_queued(self, host):
+        """Send the queued commands of host until the queue is empty."""
+        queue = self._queues[host]
+        batch = []
+        try:
+            while queue:
+                batch = queue[:]
+                queue.clear()
+                now = asyncio.get_running_loop().time()
+                for _, _, queued_at in batch:
+                    self.metrics.record_wait(host, (now - queued_at) * 1000)
+                cmds = [cmd for cmd, _, _ in batch]
+                if len(cmds) == 1:
+                    resps = [await self._hdmi_matrix_cmd(host, cmds[0])]
+                else:
+                    resps = await self._hdmi_matrix_cmds(host, cmds)
+                for (_, waiters, _), resp in zip(batch, resps):
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(resp)
+        finally:
+            # Only left over if sending was cancelled.
+            for _, waiters, _ in batch + queue:
+                for waiter in waiters:
+                    waiter.cancel()
+            queue.clear()
+            self._workers.pop(host, None)
+
+    def _commands_done(self, host, cmds):
+        """Write successful control commands through to cache and listeners."""
+        if not cmds:
+            return
+        for cmd in cmds:
+            self._patch_cache(host, cmd)
+        for listener in list(self._listeners.get(host, ())):
+            listener(cmds)
+
+    async def _probe(self, host):
+        """Probe an unreachable matrix in the background until it answers."""
+        breaker = self._breaker(host)
+        cmd = build("get video status")
+        try:
+            while breaker.is_open:
+                policy = self._policy(host)
+                await asyncio.sleep(policy.reset_timeout)
+                if not breaker.is_open:
+                    break
+                try:
+                    resp_data = await self._transport(host).send(
+                        cmd, policy.read_timeout
+                    )
+                except Exception as e:
+                    _LOGGER.debug(f"Probe of the HDMI Matrix failed: {e!r}")
+                    continue
+                if validate_response(cmd["comhead"], resp_data):
+                    _LOGGER.info(f"HDMI Matrix at '{host}' is reachable again")
+                    breaker.record_success()
+        finally:
+            self._probes.pop(host, None)
+
+    async def close(self):
+        """Close all connections."""
+        tasks = [*self._probes.values(), *self._workers.values()]
+        for task in tasks:
+            task.cancel()
+        # The workers fail their waiters and leave the transports on cancel.
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for transport in self._transports.values():
+            await transport.close()
+
+    async def get_video_status(self, host, use_cache=True):
+        """Get the video status."""
+        return await self._hdmi_matrix_cmd(
+            host, build("get video status"), use_cache=use_cache
+        )
+
+    async def get_output_status(self, host, use_cache=True):
+        """Get the output status."""
+        return await self._hdmi_matrix_cmd(
+            host, build("get output status"), use_cache=use_cache
+        )
+
+    async def get_input_status(self, host, use_cache=True):
+        """Get the input status."""
+        return await self._hdmi_matrix_cmd(
+            host, build("get input status"), use_cache=use_cache
+        )
+
+    async def get_state(self, host, use_cache=True) -> MatrixState | None:
+        """Get the parsed state built from the three status documents.
+
+        The documents are fetched concurrently. Concurrent callers share
+        one fetch and the resulting state.
+        """
+        cache_key = (host, _STATE)
+        if use_cache:
+            state = self._cache_get(cache_key)
+            if state is not None:
+                return state
+
+        return await self._single_flight(
+            cache_key, lambda: self._fetch_state(host, use_cache)
+        )
+
+    async def _fetch_state(self, host, use_cache):
+        statuses = await asyncio.gather(
+            *(
+                self._hdmi_matrix_cmd(host, build(comhead), use_cache=use_cache)
+                for comhead in STATUS_COMHEADS
             )
+        )
+        if None in statuses:
+            return None
+        state = MatrixState.from_status(*statuses)
+        self._put_state(host, state)
+        return state
+
+    async def video_switch(self, host, input_id, output_id):
+        """Switch video source."""
+        return await self._queue_cmd(host, build("video switch", input_id, output_id))
+
+    async def apply_routing(self, host, routing: Mapping[int, int]):
+        """Switch several outputs in one go.
+
+        routing maps output ids to input ids. Routes that already match the
+        routing read from the matrix are skipped and the rest are queued
+        together, so they are pipelined over a single connection. Returns the
+        routes that were applied, or None if the current routing could not
+        be read.
+        """
+        video_status = await self.get_video_status(host, use_cache=False)
+        if video_status is None:
+            return None
+        cmds = _routing_cmds(video_status["allsource"], routing)
+        resps = await asyncio.gather(*(self._queue_cmd(host, cmd) for cmd in cmds))
+        return {
+            cmd["source"][1]: cmd["source"][0] for cmd, resp in zip(cmds, resps) if resp
+        }
+
+    async def apply_preset(self, host, preset: Preset):
+        """Recall a preset, sending only the settings that differ.
+
+        The preset is compared with the cached state and the commands
+        needed are queued together, so they are pipelined over a single
+        connection. Returns the commands that were applied, or None if the
+        current state could not be read.
+        """
+        state = await self.get_state(host)
+        if state is None:
+            return None
+        cmds = preset.commands(state)
+        resps = await asyncio.gather(*(self._queue_cmd(host, cmd) for cmd in cmds))
+        return [cmd for cmd, resp in zip(cmds, resps) if resp]
+
+    async def tx_stream(self, host, output_id, on_state):
+        """Tx Stream switch."""
+        return await self._queue_cmd(host, build("tx stream", output_id, int(on_state)))
+
+    async def set_arc(self, host, output_id, on_state):
+        """Set ARC on output."""
+        return await self._queue_cmd(host, build("set arc", output_id, int(on_state)))
+
+    async def video_scaler(self, host, output_id, scaler_mode: ScalerModes):
+        """Set video scaler."""
+        return await self._queue_cmd(
+            host, build("video scaler", output_id, scaler_mode.value)
+        )
+
+    async def set_input_edid(self, host, input_id, edid_mode: EDIDModes | int):
+        """Set input EDID."""
+        return await self._queue_cmd(
+            host, build("set edid", input_id, mode_value(edid_mode))
+        )
+
+    async def port_counts(self, host) -> tuple[int, int] | None:
+        """Return the number of inputs and outputs of host.
+
+        The counts are read from the status of the matrix the first time
+        they are needed.
+        """
+        if host not in self._port_counts and await self.get_state(host) is None:
+            return None
+        return self._port_counts[host]
+
+    async def output_cec_command(
+        self, host, output_id: int | Iterable[int], cmd: OutputCECCommands
+    ):
+        """Send a CEC command to one or several outputs (zero based ids)."""
+        counts = await self.port_counts(host)
+        if counts is None:
+            return None
+        return await self._queue_cmd(
+            host, build("cec command", 1, _port_mask(output_id, counts[1]), cmd.value)
+        )
+
+    async def input_cec_command(
+        self, host, input_id: int | Iterable[int], cmd: InputCECCommands
+    ):
+        """Send a CEC command to one or several inputs (zero based ids)."""
+        counts = await self.port_counts(host)
+        if counts is None:
+            return None
+        return await self._queue_cmd(
+            host, build("cec command", 0, _port_mask(input_id, counts[0]), cmd.value)
+        )
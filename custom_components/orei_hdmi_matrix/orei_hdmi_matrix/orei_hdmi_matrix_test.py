@@ -1,9 +1,50 @@
-from orei_hdmi_matrix import HDMIMatrixAPI
+# Run with pytest or, from custom_components,
+#
+#     python -m orei_hdmi_matrix.orei_hdmi_matrix.orei_hdmi_matrix_test
+#
+# Not from the integration directory, where its select platform would
+# shadow the standard library module. Set OREI_HDMI_MATRIX_HOST to check the
+# status responses of a real matrix instead of the simulator.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+import json
+import os
 
-host = "192.168.1.131"
+from . import (
+    AsyncHDMIMatrixAPI,
+    EDIDModes,
+    HDMIMatrixAPI,
+    HDMIMatrixFleet,
+    HDMIMatrixSimulator,
+    MatrixState,
+    OutputCECCommands,
+    PortEventHistory,
+    Preset,
+    RetryPolicy,
+    ScalerModes,
+    TCPTransport,
+    edid_copy_from_output,
+    edid_mode,
+    edid_mode_name,
+    patch_status,
+)
+from .benchmark import run_benchmarks
+from .commands import STATUS_COMHEADS, build, lookup, validate_response
+from .simulator import DROP, MALFORMED, WRONG_COMHEAD
 
-if __name__ == "__main__":
-    api = HDMIMatrixAPI()
+host = os.environ.get("OREI_HDMI_MATRIX_HOST")
+
+FAST_RETRY = RetryPolicy(backoff=0.01, max_backoff=0.01, failure_threshold=100)
+
+
+@contextmanager
+def simulated_matrix(**kwargs):
+    with HDMIMatrixSimulator(**kwargs) as sim:
+        yield sim
+
+
+def check_status(api, host):
     resp = api.get_video_status(host)
     print(resp)
     for field in ["comhead", "allsource", "allinputname", "alloutputname"]:
@@ -37,11 +78,513 @@ if __name__ == "__main__":
         ), f"Field '{field}' not found in 'get_input_status' response"
     assert "get input status" in resp["comhead"]
 
-    # resp = api.video_switch(host, 1, 2)
-    # print(resp)
-    # for field in ["comhead", "result"]:
-    #     assert field in resp, f"Field '{field}' not found in 'video_switch' response"
-    # assert "video switch" in resp["comhead"]
-    # assert resp["result"] == 1
+
+def test_status():
+    if host:
+        check_status(HDMIMatrixAPI(), host)
+        return
+    with simulated_matrix() as sim:
+        check_status(HDMIMatrixAPI(), sim.host)
+
+
+def test_video_switch_patches_cache():
+    with simulated_matrix() as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        assert api.get_video_status(sim.host)["allsource"][1] == 2
+
+        resp = api.video_switch(sim.host, 5, 2)
+        assert resp["comhead"] == "video switch"
+        assert resp["result"] == 1
+        assert sim.source[1] == 5
+
+        requests = sim.requests
+        assert api.get_video_status(sim.host)["allsource"][1] == 5
+        assert sim.requests == requests
+
+
+def test_unpatchable_command_invalidates_cache():
+    with simulated_matrix(inputs=4, outputs=4) as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        api.get_state(sim.host)
+        requests = sim.requests
+        # The matrix acknowledges a port it does not have, the cached output
+        # status and state cannot follow and are read again.
+        assert api.video_scaler(sim.host, 9, ScalerModes.AUTO)
+        assert api.get_video_status(sim.host)
+        assert sim.requests == requests + 1
+        assert api.get_output_status(sim.host)
+        assert sim.requests == requests + 2
+        api.get_state(sim.host)
+        assert sim.requests == requests + 2
+
+
+def test_all_outputs_switch_patches_cache():
+    with simulated_matrix() as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        api.get_state(sim.host)
+        assert api.video_switch(sim.host, 3, 9)
+        assert sim.source == [3] * 8
+
+        requests = sim.requests
+        state = api.get_state(sim.host)
+        assert api.get_video_status(sim.host)["allsource"] == [3] * 9
+        assert api.get_output_status(sim.host)["allsource"] == [3] * 8
+        assert sim.requests == requests
+        assert state == api.get_state(sim.host, use_cache=False)
+
+
+def test_state_follows_commands():
+    with simulated_matrix() as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        state = api.get_state(sim.host)
+        assert state.power
+        assert state.output(3).scaler == ScalerModes.BYPASS
+        assert state.input_ids["Input 4"] == 4
+        assert state.zone_names[-1] == "All Outputs"
+
+        api.video_switch(sim.host, 6, 3)
+        api.video_scaler(sim.host, 3, ScalerModes.AUTO)
+        api.set_input_edid(sim.host, 6, EDIDModes.EDID_COPY_FROM_OUT_1)
+        requests = sim.requests
+        state = api.get_state(sim.host)
+        assert sim.requests == requests
+        assert state.output(3).source_id == 6
+        assert state.zone_sources[2] == 6
+        assert state.output(3).scaler == ScalerModes.AUTO
+        assert state.input(6).edid == EDIDModes.EDID_COPY_FROM_OUT_1
+        assert state == api.get_state(sim.host, use_cache=False)
+
+
+def test_state_roundtrip():
+    with simulated_matrix(inputs=4, outputs=4) as sim:
+        sim.scaler[1] = 99
+        state = HDMIMatrixAPI(FAST_RETRY).get_state(sim.host)
+    assert state.output(2).scaler == 99
+    assert MatrixState.from_dict(json.loads(json.dumps(state.as_dict()))) == state
+
+
+def test_topology_leaves_out_flags():
+    with simulated_matrix(inputs=4, outputs=4) as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        state = api.get_state(sim.host)
+        sim.connect[0] = 0
+        sim.hdbt_connect[1] = 1
+        sim.input_active[2] = 0
+        assert api.get_state(sim.host, use_cache=False).topology() == state.topology()
+        api.video_scaler(sim.host, 1, ScalerModes.AUTO)
+        assert api.get_state(sim.host).topology() != state.topology()
+
+    restored = MatrixState.from_dict(json.loads(json.dumps(state.topology())))
+    assert restored.power is None
+    assert restored.output(1).connected is None
+    assert restored.input(1).active is None
+    assert restored.zone_sources == state.zone_sources
+    assert restored.input(1).edid == state.input(1).edid
+    assert Preset.from_state(restored).arc == {}
+
+
+def test_host_locks_and_caches_are_separate():
+    with simulated_matrix() as a, simulated_matrix(inputs=4, outputs=4) as b:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        api.get_state(a.host)
+        api.get_state(b.host)
+        with ThreadPoolExecutor(2) as pool:
+            with api._host_lock(a.host):
+                busy = pool.submit(api.video_switch, a.host, 4, 1)
+                # A command to another matrix does not wait for a.
+                assert pool.submit(api.video_switch, b.host, 3, 1).result(timeout=5)
+                assert not busy.done()
+            assert busy.result(timeout=5)
+
+        requests = a.requests + b.requests
+        assert api.get_video_status(a.host)["allsource"][:2] == [4, 2]
+        assert api.get_video_status(b.host)["allsource"][:2] == [3, 2]
+        assert a.requests + b.requests == requests
+
+
+def test_retry_recovers_from_faults():
+    with simulated_matrix() as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        for fault in [DROP, MALFORMED, WRONG_COMHEAD]:
+            sim.fail_next(2, fault)
+            resp = api.video_scaler(sim.host, 3, ScalerModes.AUTO)
+            assert resp is not None, fault
+        assert sim.scaler[2] == ScalerModes.AUTO.value
+        assert sim.requests == 9
+
+
+def test_retry_policy_backs_off_within_deadline():
+    policy = RetryPolicy(backoff=0.5, max_backoff=2.0, jitter=0)
+    assert [policy.delay(attempt) for attempt in range(4)] == [0.5, 1.0, 2.0, 2.0]
+    assert policy.timeout("get video status") == policy.read_timeout
+    assert policy.timeout("video switch") == policy.write_timeout
+
+    # The next retry would end past the deadline, so it is not attempted.
+    policy = RetryPolicy(attempts=5, backoff=1.0, deadline=0.5, failure_threshold=10)
+    with simulated_matrix(drop_rate=1.0) as sim:
+        assert HDMIMatrixAPI(policy).get_video_status(sim.host) is None
+        assert sim.requests == 1
+
+
+def test_metrics():
+    with simulated_matrix() as sim:
+        api = HDMIMatrixAPI(RetryPolicy(attempts=4, backoff=0.01, max_backoff=0.01))
+        sim.fail_next(1, MALFORMED)
+        sim.fail_next(1, WRONG_COMHEAD)
+        assert api.get_video_status(sim.host)
+        assert api.get_video_status(sim.host)
+
+        metrics = api.metrics.as_dict(sim.host)
+        video = metrics["commands"]["get video status"]
+        assert video["requests"] == 1
+        assert video["retries"] == 2
+        assert video["errors"] == 1
+        assert video["invalid"] == 1
+        assert video["latency"]["count"] == 1
+        assert metrics["cache_hits"] == 1
+        assert metrics["cache_misses"] == 1
+        assert api.metrics.totals(sim.host)["cache_hit_ratio"] == 0.5
+        json.dumps(api.metrics.as_dict())
+
+
+def test_invalid_responses_are_rejected():
+    assert not validate_response("get video status", None)
+    assert not validate_response(
+        "get video status", {"comhead": "get video status", "allsource": []}
+    )
+    with simulated_matrix(wrong_comhead_rate=1.0) as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        assert api.get_input_status(sim.host) is None
+        assert sim.requests == FAST_RETRY.attempts
+
+
+def test_command_registry():
+    cmd = build("video switch", 3, 2)
+    assert cmd == {"comhead": "video switch", "source": [3, 2]}
+    assert lookup("video switch").validate({"comhead": "video switch"})
+    # Unknown comheads only need to be echoed.
+    assert validate_response("get foo", {"comhead": "get foo"})
+    assert not validate_response("get foo", {"comhead": "get bar"})
+    assert STATUS_COMHEADS == (
+        "get video status",
+        "get output status",
+        "get input status",
+    )
+
+    # Two outputs and the All Outputs zone.
+    statuses = {"get video status": {"allsource": [1, 2, 1]}}
+    assert patch_status(statuses, cmd) == set()
+    assert statuses["get video status"]["allsource"] == [1, 3, 1]
+    assert patch_status(statuses, build("video switch", 1, 9)) == {"get video status"}
+    assert patch_status(statuses, build("video switch", 4, 3)) == set()
+    assert statuses["get video status"]["allsource"] == [4, 4, 4]
+    assert patch_status(statuses, build("cec command", 1, [1, 0], 4)) == set()
+
+
+def test_circuit_breaker_fails_fast():
+    policy = RetryPolicy(attempts=1, failure_threshold=2, reset_timeout=60)
+    with simulated_matrix(drop_rate=1.0) as sim:
+        api = HDMIMatrixAPI(policy)
+        for _ in range(5):
+            assert api.get_output_status(sim.host) is None
+        assert sim.requests == 2
+
+
+def test_async_client_reuses_connections():
+    async def run(sim):
+        api = AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY)
+        for _ in range(5):
+            assert await api.get_output_status(sim.host, use_cache=False)
+        await api.close()
+
+    with simulated_matrix() as sim:
+        asyncio.run(run(sim))
+        assert sim.requests == 5
+        assert sim.connections == 1
+
+
+def test_concurrent_reads_coalesce():
+    async def run(sim):
+        api = AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY)
+        results = await asyncio.gather(
+            *(api.get_video_status(sim.host, use_cache=False) for _ in range(5)),
+            *(api.get_state(sim.host, use_cache=False) for _ in range(3)),
+        )
+        await api.close()
+        return results
+
+    with simulated_matrix(latency=0.05) as sim:
+        results = asyncio.run(run(sim))
+        assert all(r is results[0] for r in results[:5])
+        assert all(r is results[5] for r in results[5:])
+        # One request per status document.
+        assert sim.requests == 3
+
+    with simulated_matrix(latency=0.05) as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        with ThreadPoolExecutor(8) as executor:
+            results = list(
+                executor.map(lambda _: api.get_output_status(sim.host), range(8))
+            )
+        assert all(r is results[0] for r in results)
+        assert sim.requests == 1
+
+
+def test_apply_routing_skips_matching_routes():
+    async def run(sim):
+        api = AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY)
+        applied = await api.apply_routing(sim.host, {1: 1, 2: 4, 3: 4, 8: 1})
+        await api.close()
+        return applied
+
+    with simulated_matrix() as sim:
+        assert asyncio.run(run(sim)) == {2: 4, 3: 4, 8: 1}
+        assert sim.source == [1, 4, 4, 4, 5, 6, 7, 1]
+        # One status read plus three switches over a single connection.
+        assert sim.requests == 4
+        assert sim.connections == 1
+
+
+def test_routing_after_all_outputs_switch():
+    async def run(sim):
+        api = AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY)
+        await api.get_state(sim.host)
+        await api.video_switch(sim.host, 3, 9)
+        applied = await api.apply_routing(sim.host, {1: 3, 2: 2, 9: 3})
+        await api.close()
+        return applied
+
+    with simulated_matrix() as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        api.get_state(sim.host)
+        api.video_switch(sim.host, 3, 9)
+        assert api.apply_routing(sim.host, {1: 3, 2: 2}) == {2: 2}
+        assert sim.source[:3] == [3, 2, 3]
+
+        sim.reset()
+        # Switching all outputs is not skipped because of output 1 alone.
+        assert asyncio.run(run(sim)) == {2: 2, 9: 3}
+        assert sim.source == [3] * 8
+
+
+def test_queued_writes_merge():
+    async def run(sim):
+        api = AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY)
+        await api.get_state(sim.host)
+        requests = sim.requests
+        resps = await asyncio.gather(
+            api.video_switch(sim.host, 2, 1),
+            api.output_cec_command(sim.host, 0, OutputCECCommands.VOLUME_UP),
+            api.video_switch(sim.host, 3, 1),
+            api.output_cec_command(sim.host, 0, OutputCECCommands.VOLUME_DOWN),
+            api.video_switch(sim.host, 4, 1),
+            api.set_arc(sim.host, 1, True),
+        )
+        await api.close()
+        return resps, sim.requests - requests
+
+    with simulated_matrix() as sim:
+        resps, requests = asyncio.run(run(sim))
+        assert all(resps)
+        # The switches to inputs 2 and 3 were superseded before being sent.
+        assert requests == 4
+        assert sim.source[0] == 4
+        assert sim.arc[0] == 1
+        assert [index for _, _, index in sim.cec_log] == [
+            OutputCECCommands.VOLUME_UP.value,
+            OutputCECCommands.VOLUME_DOWN.value,
+        ]
+
+
+def test_failed_batch_does_not_repeat_cec():
+    async def run(sim):
+        api = AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY)
+        await api.get_state(sim.host)
+        sim.fail_next(2, MALFORMED)
+        resps = await asyncio.gather(
+            api.set_arc(sim.host, 1, True),
+            api.output_cec_command(sim.host, 0, OutputCECCommands.VOLUME_UP),
+        )
+        await api.close()
+        return resps
+
+    with simulated_matrix() as sim:
+        arc, cec = asyncio.run(run(sim))
+        # The setting is sent again, the key press that may have reached
+        # the matrix is not.
+        assert arc and sim.arc[0] == 1
+        assert cec is None
+        assert len(sim.cec_log) == 1
+
+
+def test_failed_cec_command_is_not_repeated():
+    async def run(sim):
+        api = AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY)
+        await api.get_state(sim.host)
+        sim.fail_next(1, MALFORMED)
+        resp = await api.output_cec_command(sim.host, 0, OutputCECCommands.POWER_ON)
+        await api.close()
+        return resp
+
+    with simulated_matrix() as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        # The port count of the CEC mask is read before.
+        api.get_state(sim.host)
+        sim.fail_next(1, MALFORMED)
+        assert api.output_cec_command(sim.host, 0, OutputCECCommands.POWER_ON) is None
+        assert len(sim.cec_log) == 1
+        # Settings are still retried.
+        sim.fail_next(1, MALFORMED)
+        assert api.set_arc(sim.host, 1, True)
+        assert asyncio.run(run(sim)) is None
+        assert len(sim.cec_log) == 2
+
+
+def test_port_event_history():
+    history = PortEventHistory(size=3)
+    with simulated_matrix(inputs=4, outputs=4) as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        assert history.observe(api.get_state(sim.host), 1.0) == 0
+        sim.connect[1] = 0
+        sim.hdbt_connect[2] = 1
+        assert history.observe(api.get_state(sim.host, use_cache=False), 2.0) == 2
+        sim.connect[1] = 1
+        sim.input_active[3] = 0
+        assert history.observe(api.get_state(sim.host, use_cache=False), 3.0) == 2
+        assert history.observe(api.get_state(sim.host, use_cache=False), 4.0) == 0
+
+    # The oldest event was overwritten.
+    assert len(history) == 3
+    assert history.events() == [
+        {"time": 2.0, "event": "hdbt_connected", "port_id": 3},
+        {"time": 3.0, "event": "output_connected", "port_id": 2},
+        {"time": 3.0, "event": "input_signal_lost", "port_id": 4},
+    ]
+    assert [e["port_id"] for e in history.events(since=2.0)] == [2, 4]
+
+
+def test_tcp_transport_pipelines_and_reconnects():
+    async def run(sim):
+        api = AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY)
+        api.set_transport(sim.host, TCPTransport(sim.host, sim.control_port))
+        applied = await api.apply_routing(sim.host, {1: 3, 2: 3, 3: 1})
+        connections = sim.connections
+        # The matrix drops the connection, the command is sent again on a
+        # new one.
+        sim.fail_next(1, DROP)
+        arc = await api.set_arc(sim.host, 4, True)
+        rejected = await api.video_switch(sim.host, 99, 1)
+        await api.close()
+        return applied, arc, rejected, sim.connections - connections
+
+    with simulated_matrix(control_port=0) as sim:
+        applied, arc, rejected, reconnects = asyncio.run(run(sim))
+        assert applied == {1: 3, 2: 3, 3: 1}
+        assert sim.source[:3] == [3, 3, 1]
+        assert arc and sim.arc[3] == 1
+        assert rejected is None
+        assert reconnects == 1
+
+
+def test_preset_recall_sends_diff():
+    async def run(sim):
+        api = AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY)
+        preset = Preset.from_state(await api.get_state(sim.host))
+        preset = Preset.from_dict(json.loads(json.dumps(preset.as_dict())))
+        await api.video_switch(sim.host, 1, 2)
+        await api.set_arc(sim.host, 3, True)
+        await api.set_input_edid(sim.host, 4, EDIDModes.EDID_1080P_DOLBY_DTS_5_1)
+        requests = sim.requests
+        applied = await api.apply_preset(sim.host, preset)
+        await api.close()
+        return applied, sim.requests - requests
+
+    with simulated_matrix() as sim:
+        applied, requests = asyncio.run(run(sim))
+        assert applied == [
+            {"comhead": "set edid", "edid": [4, 1]},
+            {"comhead": "video switch", "source": [2, 2]},
+            {"comhead": "set arc", "arc": [3, 0]},
+        ]
+        assert requests == 3
+        assert sim.source[1] == 2
+        assert sim.arc[2] == 0
+
+
+def test_fleet_routes_across_cascade():
+    async def run(a, b, c):
+        fleet = HDMIMatrixFleet(AsyncHDMIMatrixAPI(retry_policy=FAST_RETRY), 2)
+        # a feeds b on output 8, b feeds c on output 7.
+        fleet.add_link(a.host, 8, b.host, 1)
+        fleet.add_link(b.host, 7, c.host, 2)
+        states = await fleet.refresh()
+        applied = await fleet.route(a.host, 3, c.host, [4, 5])
+        unreachable = await fleet.route(c.host, 1, a.host, 1)
+        await fleet.api.close()
+        return states, applied, unreachable
+
+    with ExitStack() as stack:
+        a, b, c = (stack.enter_context(simulated_matrix()) for _ in range(3))
+        states, applied, unreachable = asyncio.run(run(a, b, c))
+        assert all(states.values())
+        assert applied == {a.host: {8: 3}, b.host: {7: 1}, c.host: {4: 2, 5: 2}}
+        assert a.source[7] == 3
+        assert b.source[6] == 1
+        assert c.source[3:5] == [2, 2]
+        assert unreachable is None
+
+
+def test_cec_ports_merge():
+    with simulated_matrix() as sim:
+        api = HDMIMatrixAPI(FAST_RETRY)
+        assert api.output_cec_command(sim.host, [0, 3, 7], OutputCECCommands.POWER_OFF)
+        assert sim.cec_log == [(1, [1, 0, 0, 1, 0, 0, 0, 1], 1)]
+
+
+def test_matrix_sizes():
+    for size in [4, 16]:
+        with simulated_matrix(inputs=size, outputs=size) as sim:
+            api = HDMIMatrixAPI(FAST_RETRY)
+            assert api.output_cec_command(
+                sim.host, [0, size - 1], OutputCECCommands.POWER_OFF
+            )
+            mask = [0] * size
+            mask[0] = mask[-1] = 1
+            assert sim.cec_log == [(1, mask, OutputCECCommands.POWER_OFF.value)]
+
+            state = api.get_state(sim.host)
+            assert len(state.inputs) == len(state.outputs) == size
+            assert len(state.zone_names) == size + 1
+            # One status read per document regardless of the size.
+            assert sim.requests == 4
+
+            mode = edid_copy_from_output(size)
+            assert api.set_input_edid(sim.host, 2, mode)
+            assert edid_mode_name(api.get_state(sim.host).input(2).edid) == (
+                f"EDID_COPY_FROM_OUT_{size}"
+            )
+            assert edid_mode(f"edid_copy_from_out_{size}") == mode
+
+
+def test_benchmark_report():
+    report = run_benchmarks(hosts=2, zones=2, cycles=1, count=2, latency=0)
+    results = report["results"]
+    for key in [
+        "zone_poll",
+        "coordinator_poll",
+        "video_switch",
+        "cec_throughput",
+        "cache",
+    ]:
+        assert key in results, f"Benchmark '{key}' missing from report"
+    assert results["video_switch"]["async"]["count"] == 2
+    assert results["video_switch"]["async_tcp"]["count"] == 2
+    assert results["cache"]["validate_us"] > 0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
 
     print("All tests passed")
@@ -0,0 +1,88 @@
+"""Named snapshots of the settings of a matrix that can be recalled."""
+
+from dataclasses import dataclass, field
+
+from .commands import build
+from .state import MatrixState, mode_value
+
+
+def _int_keys(mapping, convert=int):
+    """Restore the int port ids of a mapping read back from JSON."""
+    return {int(port_id): convert(value) for port_id, value in mapping.items()}
+
+
+@dataclass(slots=True)
+class Preset:
+    """Routing, scaler, ARC, stream and EDID settings of a matrix.
+
+    Each mapping is keyed by output id, or input id for edid, and may cover
+    only some ports. Ports left out are not touched when it is recalled.
+    """
+
+    routing: dict[int, int] = field(default_factory=dict)
+    scaler: dict[int, int] = field(default_factory=dict)
+    arc: dict[int, bool] = field(default_factory=dict)
+    stream: dict[int, bool] = field(default_factory=dict)
+    edid: dict[int, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_state(cls, state: MatrixState):
+        """Capture all settings of a matrix state."""
+        return cls(
+            routing={o.output_id: o.source_id for o in state.outputs},
+            scaler={o.output_id: mode_value(o.scaler) for o in state.outputs},
+            # The flags are unknown in a state restored from its topology.
+            arc={o.output_id: o.arc for o in state.outputs if o.arc is not None},
+            stream={
+                o.output_id: o.stream for o in state.outputs if o.stream is not None
+            },
+            edid={i.input_id: mode_value(i.edid) for i in state.inputs},
+        )
+
+    def as_dict(self) -> dict:
+        """Return a JSON serializable copy of the preset."""
+        return {
+            "routing": dict(self.routing),
+            "scaler": dict(self.scaler),
+            "arc": dict(self.arc),
+            "stream": dict(self.stream),
+            "edid": dict(self.edid),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build the preset from a dict returned by as_dict()."""
+        return cls(
+            routing=_int_keys(data.get("routing", {})),
+            scaler=_int_keys(data.get("scaler", {})),
+            arc=_int_keys(data.get("arc", {}), bool),
+            stream=_int_keys(data.get("stream", {}), bool),
+            edid=_int_keys(data.get("edid", {})),
+        )
+
+    def commands(self, state: MatrixState) -> list[dict]:
+        """Build the control commands turning state into this preset.
+
+        Settings that already match and ports the matrix does not have are
+        skipped. EDID changes come first, as sources renegotiate their
+        signal after them.
+        """
+        cmds = []
+        for input_id, mode in self.edid.items():
+            input_state = state.input(input_id)
+            if input_state is not None and mode_value(input_state.edid) != mode:
+                cmds.append(build("set edid", input_id, mode))
+        for output_id, output in enumerate(state.outputs, 1):
+            input_id = self.routing.get(output_id)
+            if input_id is not None and output.source_id != input_id:
+                cmds.append(build("video switch", input_id, output_id))
+            scaler = self.scaler.get(output_id)
+            if scaler is not None and mode_value(output.scaler) != scaler:
+                cmds.append(build("video scaler", output_id, scaler))
+            stream = self.stream.get(output_id)
+            if stream is not None and output.stream != stream:
+                cmds.append(build("tx stream", output_id, int(stream)))
+            arc = self.arc.get(output_id)
+            if arc is not None and output.arc != arc:
+                cmds.append(build("set arc", output_id, int(arc)))
+        return cmds
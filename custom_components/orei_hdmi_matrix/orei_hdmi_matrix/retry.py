@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+import random
+import time
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retry, timeout and circuit breaker settings for one matrix."""
+
+    # Timeout of a single status read ("get ... status") attempt.
+    read_timeout: float = 3.0
+    # Timeout of a single control command attempt.
+    write_timeout: float = 5.0
+    attempts: int = 3
+    # First retry delay, doubled on every further retry up to max_backoff.
+    backoff: float = 0.5
+    max_backoff: float = 4.0
+    # Random +/- fraction applied to each retry delay.
+    jitter: float = 0.2
+    # Total time budget of a command including all retries.
+    deadline: float = 15.0
+    # Consecutive failed commands before the circuit opens.
+    failure_threshold: int = 3
+    # Time the circuit stays open before the device is probed again.
+    reset_timeout: float = 30.0
+
+    def timeout(self, comhead) -> float:
+        """Return the attempt timeout for a command."""
+        if comhead.startswith("get "):
+            return self.read_timeout
+        return self.write_timeout
+
+    def delay(self, attempt) -> float:
+        """Return the delay before the retry following attempt (zero based)."""
+        delay = min(self.max_backoff, self.backoff * 2**attempt)
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class CircuitBreaker:
+    """Fail fast while a matrix is known to be unreachable."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0) -> None:
+        """Initialize the breaker."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        """Return True while commands are being rejected."""
+        return self.state != self.CLOSED
+
+    def allow(self) -> bool:
+        """Return True if a command may be sent to the device.
+
+        Once the reset timeout has passed a single command is let through
+        as a probe, the outcome of which closes or re-opens the circuit.
+        """
+        if self.state == self.CLOSED:
+            return True
+        if (
+            self.state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self.state = self.HALF_OPEN
+            return True
+        return False
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful command."""
+        self.state = self.CLOSED
+        self._failures = 0
+
+    def record_failure(self) -> bool:
+        """Count a failed command, return True if the circuit just opened."""
+        self._failures += 1
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self._failures >= self.failure_threshold
+        ):
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            return True
+        return False
@@ -0,0 +1,301 @@
+"""Local stand-in for an OREI HDMI matrix.
+
+Serves the same /cgi-bin/instr JSON protocol as the device, and optionally
+the ASCII control port, so the clients can be tested and benchmarked
+without hardware:
+
+    with HDMIMatrixSimulator(latency=0.01) as sim:
+        HDMIMatrixAPI().get_video_status(sim.host)
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import random
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+from threading import Lock, Thread
+import time
+
+from .transport import decode_ascii
+
+_LOGGER = logging.getLogger(__name__)
+
+DROP = "drop"
+MALFORMED = "malformed"
+WRONG_COMHEAD = "wrong_comhead"
+
+
+class HDMIMatrixSimulator:
+    """In-process HTTP server emulating an OREI HDMI matrix."""
+
+    def __init__(
+        self,
+        inputs=8,
+        outputs=8,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        drop_rate=0.0,
+        malformed_rate=0.0,
+        wrong_comhead_rate=0.0,
+        seed=None,
+        control_port=None,
+    ) -> None:
+        """Initialize the simulator.
+
+        latency is added to every response in seconds. drop_rate,
+        malformed_rate and wrong_comhead_rate are the probabilities of
+        closing the connection without an answer, answering with invalid
+        JSON and echoing the wrong comhead. All of them may be changed
+        while the simulator is running. The ASCII control port is only
+        served if control_port is given, 0 picks a free port.
+        """
+        self.inputs = inputs
+        self.outputs = outputs
+        self.latency = latency
+        self.drop_rate = drop_rate
+        self.malformed_rate = malformed_rate
+        self.wrong_comhead_rate = wrong_comhead_rate
+        self.requests = 0
+        self.connections = 0
+        self.cec_log: list[tuple[int, list[int], int]] = []
+
+        self._random = random.Random(seed)
+        self._lock = Lock()
+        self._faults: list[str] = []
+        self._address = (host, port)
+        self._server = None
+        self._control_address = None if control_port is None else (host, control_port)
+        self._control_server = None
+        self.reset()
+
+    def reset(self):
+        """Restore the power-on state of the matrix."""
+        with self._lock:
+            self.power = 1
+            self.input_names = [f"Input {i}" for i in range(1, self.inputs + 1)]
+            # The last zone switches all outputs at once.
+            self.output_names = [
+                f"Output {i}" for i in range(1, self.outputs + 1)
+            ] + ["All Outputs"]
+            self.hdbt_names = [f"HDBT {i}" for i in range(1, self.outputs + 1)]
+            self.source = [min(i, self.inputs) for i in range(1, self.outputs + 1)]
+            self.scaler = [0] * self.outputs
+            self.stream = [1] * self.outputs
+            self.hdbt_stream = [1] * self.outputs
+            self.arc = [0] * self.outputs
+            self.connect = [1] * self.outputs
+            self.hdbt_connect = [0] * self.outputs
+            self.hdcp = [1] * self.outputs
+            # EDID modes are reported zero based.
+            self.edid = [0] * self.inputs
+            self.input_active = [1] * self.inputs
+            self._faults.clear()
+
+    def fail_next(self, count=1, fault=DROP):
+        """Answer the next count requests with the given fault."""
+        with self._lock:
+            self._faults.extend([fault] * count)
+
+    @property
+    def host(self) -> str:
+        """Return the 'host:port' the simulator listens on."""
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    @property
+    def control_port(self) -> int | None:
+        """Return the port of the ASCII control server, if it runs."""
+        if self._control_server is None:
+            return None
+        return self._control_server.server_address[1]
+
+    @staticmethod
+    def _serve(server):
+        server.daemon_threads = True
+        Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        return server
+
+    def start(self):
+        """Start serving in background threads."""
+        handler = type("Handler", (_Handler,), {"simulator": self})
+        self._server = self._serve(ThreadingHTTPServer(self._address, handler))
+        if self._control_address is not None:
+            handler = type("Handler", (_ControlHandler,), {"simulator": self})
+            self._control_server = self._serve(
+                ThreadingTCPServer(self._control_address, handler)
+            )
+        return self
+
+    def stop(self):
+        """Stop serving."""
+        for server in (self._server, self._control_server):
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+        self._server = self._control_server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _next_fault(self):
+        with self._lock:
+            if self._faults:
+                return self._faults.pop(0)
+            roll = self._random.random()
+        if roll < self.drop_rate:
+            return DROP
+        roll -= self.drop_rate
+        if roll < self.malformed_rate:
+            return MALFORMED
+        roll -= self.malformed_rate
+        if roll < self.wrong_comhead_rate:
+            return WRONG_COMHEAD
+        return None
+
+    def handle(self, cmd):
+        """Apply a command to the simulated state and return the response."""
+        comhead = cmd.get("comhead")
+        with self._lock:
+            if comhead == "get video status":
+                return {
+                    "comhead": comhead,
+                    "power": self.power,
+                    "allsource": self.source + [self.source[0]],
+                    "allinputname": list(self.input_names),
+                    "alloutputname": list(self.output_names),
+                }
+            if comhead == "get output status":
+                return {
+                    "comhead": comhead,
+                    "power": self.power,
+                    "allsource": list(self.source),
+                    "allscaler": list(self.scaler),
+                    "allout": list(self.stream),
+                    "allhdbtout": list(self.hdbt_stream),
+                    "allconnect": list(self.connect),
+                    "allhdbtconnect": list(self.hdbt_connect),
+                    "allarc": list(self.arc),
+                    "allhdcp": list(self.hdcp),
+                    "name": self.output_names[: self.outputs],
+                    "hdbtname": list(self.hdbt_names),
+                }
+            if comhead == "get input status":
+                return {
+                    "comhead": comhead,
+                    "power": self.power,
+                    "edid": list(self.edid),
+                    "inactive": list(self.input_active),
+                    "inname": list(self.input_names),
+                }
+            if comhead == "video switch":
+                input_id, output_id = cmd["source"]
+                if not 1 <= input_id <= self.inputs:
+                    return {"comhead": comhead, "result": 0}
+                if output_id == self.outputs + 1:
+                    self.source = [input_id] * self.outputs
+                else:
+                    self._set(self.source, output_id, input_id)
+            elif comhead == "video scaler":
+                self._set(self.scaler, *cmd["scaler"])
+            elif comhead == "tx stream":
+                self._set(self.stream, *cmd["out"])
+            elif comhead == "set arc":
+                self._set(self.arc, *cmd["arc"])
+            elif comhead == "set edid":
+                input_id, mode = cmd["edid"]
+                self._set(self.edid, input_id, mode - 1)
+            elif comhead == "cec command":
+                self.cec_log.append((cmd["object"], list(cmd["port"]), cmd["index"]))
+            else:
+                return {"comhead": comhead, "result": 0}
+        return {"comhead": comhead, "result": 1}
+
+    @staticmethod
+    def _set(values, port_id, value):
+        if 1 <= port_id <= len(values):
+            values[port_id - 1] = value
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive handler for /cgi-bin/instr."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, without TCP_NODELAY every
+    # keep-alive response would wait for the client's delayed ACK.
+    disable_nagle_algorithm = True
+    simulator: HDMIMatrixSimulator
+
+    def setup(self):
+        super().setup()
+        with self.simulator._lock:
+            self.simulator.connections += 1
+
+    def do_POST(self):
+        simulator = self.simulator
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with simulator._lock:
+            simulator.requests += 1
+        if simulator.latency:
+            time.sleep(simulator.latency)
+        if self.path != "/cgi-bin/instr":
+            self.send_error(404)
+            return
+
+        fault = simulator._next_fault()
+        if fault == DROP:
+            self.close_connection = True
+            return
+        try:
+            resp = simulator.handle(json.loads(body))
+        except (ValueError, KeyError, TypeError) as e:
+            _LOGGER.debug(f"Bad request to simulator: {e!r}")
+            self.send_error(400)
+            return
+        if fault == WRONG_COMHEAD:
+            resp["comhead"] = (
+                "get output status"
+                if resp["comhead"] == "get video status"
+                else "get video status"
+            )
+        data = json.dumps(resp).encode("utf-8")
+        if fault == MALFORMED:
+            data = data[: len(data) // 2]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        _LOGGER.debug(format, *args)
+
+
+class _ControlHandler(StreamRequestHandler):
+    """ASCII control port answering every command line with one line."""
+
+    disable_nagle_algorithm = True
+    simulator: HDMIMatrixSimulator
+
+    def setup(self):
+        super().setup()
+        with self.simulator._lock:
+            self.simulator.connections += 1
+
+    def handle(self):
+        simulator = self.simulator
+        for line in self.rfile:
+            with simulator._lock:
+                simulator.requests += 1
+            if simulator.latency:
+                time.sleep(simulator.latency)
+            if simulator._next_fault() == DROP:
+                return
+            text = line.decode("latin-1").strip()
+            cmd = decode_ascii(text)
+            ok = cmd is not None and simulator.handle(cmd)["result"] == 1
+            self.wfile.write(f"{text if ok else 'error'}\r\n".encode("latin-1"))
@@ -0,0 +1,232 @@
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+
+from .modes import EDIDModes, ScalerModes
+
+
+def _decode(enum, value):
+    """Decode a device value into enum, keeping unknown values as int."""
+    try:
+        return enum(value)
+    except ValueError:
+        return value
+
+
+def _encode(items):
+    """Dict factory turning decoded modes back into device values."""
+    return {
+        key: mode_value(value)
+        for key, value in items
+        if key not in ("input_ids", "zone_ids")
+    }
+
+
+# Flags that are not part of the topology of a matrix, as they change on
+# their own, like a display being plugged in, or are read back on every poll.
+_OUTPUT_FLAGS = ("stream", "arc", "connected", "hdcp", "hdbt_stream", "hdbt_connected")
+_INPUT_FLAGS = ("active",)
+
+
+def mode_name(value) -> str:
+    """Return the name of a decoded mode, or the raw value for unknown ones."""
+    return value.name if isinstance(value, Enum) else str(value)
+
+
+def mode_value(mode):
+    """Return the device value of a mode, which may be a plain int."""
+    return mode.value if isinstance(mode, Enum) else mode
+
+
+@dataclass(slots=True)
+class InputState:
+    """State of one matrix input."""
+
+    input_id: int
+    name: str
+    edid: EDIDModes | int
+    # The flags are None while unknown, in a state restored from its topology.
+    active: bool | None
+
+
+@dataclass(slots=True)
+class OutputState:
+    """State of one matrix output."""
+
+    output_id: int
+    name: str
+    source_id: int
+    scaler: ScalerModes | int
+    stream: bool | None
+    arc: bool | None
+    connected: bool | None
+    hdcp: bool | None
+    hdbt_stream: bool | None
+    hdbt_connected: bool | None
+
+
+@dataclass(slots=True)
+class MatrixState:
+    """Parsed state of a matrix built from its three status documents."""
+
+    power: bool | None
+    inputs: list[InputState]
+    outputs: list[OutputState]
+    # Zones are the outputs plus a trailing "All Outputs" zone.
+    zone_names: list[str]
+    zone_sources: list[int]
+    input_ids: dict[str, int] = field(default_factory=dict)
+    zone_ids: dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.input_ids = {i.name: i.input_id for i in self.inputs}
+        self.zone_ids = {name: idx for idx, name in enumerate(self.zone_names, 1)}
+
+    @classmethod
+    def from_status(cls, video_status, output_status, input_status):
+        """Build the state from the video, output and input status."""
+        outputs = [
+            OutputState(
+                output_id=idx,
+                name=name,
+                source_id=output_status["allsource"][idx - 1],
+                scaler=_decode(ScalerModes, output_status["allscaler"][idx - 1]),
+                stream=output_status["allout"][idx - 1] == 1,
+                arc=output_status["allarc"][idx - 1] == 1,
+                connected=output_status["allconnect"][idx - 1] == 1,
+                hdcp=output_status["allhdcp"][idx - 1] == 1,
+                hdbt_stream=output_status["allhdbtout"][idx - 1] == 1,
+                hdbt_connected=output_status["allhdbtconnect"][idx - 1] == 1,
+            )
+            for idx, name in enumerate(output_status["name"], 1)
+        ]
+        inputs = [
+            InputState(
+                input_id=idx,
+                name=name,
+                # The input status reports EDID modes zero based.
+                edid=_decode(EDIDModes, input_status["edid"][idx - 1] + 1),
+                active=bool(input_status["inactive"][idx - 1]),
+            )
+            for idx, name in enumerate(video_status["allinputname"], 1)
+        ]
+        return cls(
+            power=output_status["power"] == 1,
+            inputs=inputs,
+            outputs=outputs,
+            zone_names=list(video_status["alloutputname"]),
+            zone_sources=list(video_status["allsource"]),
+        )
+
+    def as_dict(self) -> dict:
+        """Return a JSON serializable copy of the state."""
+        return asdict(self, dict_factory=_encode)
+
+    def topology(self) -> dict:
+        """Return the port names, routing, scaler and EDID settings.
+
+        The result is an as_dict() copy without the power, link, signal and
+        output flags, so it only changes when the matrix is reconfigured.
+        """
+        data = self.as_dict()
+        del data["power"]
+        for output in data["outputs"]:
+            for flag in _OUTPUT_FLAGS:
+                del output[flag]
+        for input_data in data["inputs"]:
+            for flag in _INPUT_FLAGS:
+                del input_data[flag]
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build the state from a dict returned by as_dict() or topology().
+
+        Flags left out by topology() are None.
+        """
+        inputs = [
+            InputState(
+                **{
+                    **dict.fromkeys(_INPUT_FLAGS),
+                    **i,
+                    "edid": _decode(EDIDModes, i["edid"]),
+                }
+            )
+            for i in data["inputs"]
+        ]
+        outputs = [
+            OutputState(
+                **{
+                    **dict.fromkeys(_OUTPUT_FLAGS),
+                    **o,
+                    "scaler": _decode(ScalerModes, o["scaler"]),
+                }
+            )
+            for o in data["outputs"]
+        ]
+        return cls(
+            power=data.get("power"),
+            inputs=inputs,
+            outputs=outputs,
+            zone_names=list(data["zone_names"]),
+            zone_sources=list(data["zone_sources"]),
+        )
+
+    def input(self, input_id) -> InputState | None:
+        """Return the input with the given id, if it exists."""
+        if 1 <= input_id <= len(self.inputs):
+            return self.inputs[input_id - 1]
+        return None
+
+    def output(self, output_id) -> OutputState | None:
+        """Return the output with the given id, if it exists."""
+        if 1 <= output_id <= len(self.outputs):
+            return self.outputs[output_id - 1]
+        return None
+
+    def apply(self, cmd) -> bool:
+        """Apply a successful control command in place.
+
+        Returns False if the command could not be applied and the state has
+        to be fetched again.
+        """
+        comhead = cmd["comhead"]
+        if comhead == "video switch":
+            input_id, output_id = cmd["source"]
+            if output_id == len(self.outputs) + 1:
+                # The All Outputs zone switches every output.
+                for output in self.outputs:
+                    output.source_id = input_id
+                self.zone_sources[:] = [input_id] * len(self.zone_sources)
+                return True
+            output = self.output(output_id)
+            if output is None:
+                return False
+            output.source_id = input_id
+            self.zone_sources[output_id - 1] = input_id
+            return True
+        if comhead == "set edid":
+            input_id, mode = cmd["edid"]
+            input_state = self.input(input_id)
+            if input_state is None:
+                return False
+            input_state.edid = _decode(EDIDModes, mode)
+            return True
+        if comhead == "video scaler":
+            output_id, value = cmd["scaler"]
+        elif comhead == "set arc":
+            output_id, value = cmd["arc"]
+        elif comhead == "tx stream":
+            output_id, value = cmd["out"]
+        else:
+            return True
+
+        output = self.output(output_id)
+        if output is None:
+            return False
+        if comhead == "video scaler":
+            output.scaler = _decode(ScalerModes, value)
+        elif comhead == "set arc":
+            output.arc = value == 1
+        else:
+            output.stream = value == 1
+        return True
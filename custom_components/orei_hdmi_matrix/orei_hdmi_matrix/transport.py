@@ -0,0 +1,308 @@
+"""Transports carrying commands from the async client to a matrix.
+
+HTTPTransport POSTs the JSON command documents to /cgi-bin/instr, like the
+matrix's web interface. TCPTransport writes control commands as ASCII lines
+to the control port of the matrix over one long-lived connection, which
+saves the HTTP exchange on every switch, and leaves everything else, like
+the status reads, to an HTTP transport:
+
+    api = AsyncHDMIMatrixAPI()
+    api.set_transport(host, TCPTransport(host, fallback=HTTPTransport(host)))
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import re
+
+from .commands import COMMANDS, lookup
+
+_LOGGER = logging.getLogger(__name__)
+
+INSTR_PATH = "/cgi-bin/instr"
+
+DEFAULT_CONTROL_PORT = 23
+
+# Replies of the control port to a command it did not accept.
+ASCII_ERRORS = ("error", "unknown", "invalid")
+
+
+def encode_ascii(cmd) -> str | None:
+    """Return the ASCII form of a command, or None if it has none."""
+    command = lookup(cmd["comhead"])
+    if command.ascii is None:
+        return None
+    return command.ascii.format(*cmd[command.key])
+
+
+def _ascii_pattern(template):
+    pattern = re.escape(template)
+    for field in (r"\{0\}", r"\{1\}"):
+        pattern = pattern.replace(field, r"(\d+)")
+    return re.compile(pattern)
+
+
+_ASCII_PATTERNS = [
+    (command, _ascii_pattern(command.ascii))
+    for command in COMMANDS.values()
+    if command.ascii is not None
+]
+
+
+def decode_ascii(line) -> dict | None:
+    """Parse an ASCII command back into its JSON form, or None."""
+    for command, pattern in _ASCII_PATTERNS:
+        match = pattern.fullmatch(line.strip())
+        if match:
+            return command.build(*(int(v) for v in match.groups()))
+    return None
+
+
+def _split_host(host):
+    """Split a 'host[:port]' string into its host and port."""
+    if host.startswith("["):
+        name, _, port = host[1:].partition("]")
+        return name, int(port[1:]) if port.startswith(":") else 80
+    name, sep, port = host.partition(":")
+    if sep and host.count(":") == 1:
+        return name, int(port)
+    return host, 80
+
+
+class _HTTPConnectionPool:
+    """Small pool of persistent HTTP/1.1 connections to a single matrix."""
+
+    def __init__(self, host, max_size=2) -> None:
+        """Initialize the pool."""
+        self._host = host
+        self._addr = _split_host(host)
+        self._idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(max_size)
+
+    async def post(self, path, body: bytes, timeout):
+        """POST a body and return the decoded JSON response."""
+        return (await self.post_many(path, [body], timeout))[0]
+
+    async def post_many(self, path, bodies: list[bytes], timeout):
+        """POST several bodies pipelined over a single connection.
+
+        Returns the decoded JSON responses in request order.
+        """
+        async with self._slots:
+            return await asyncio.wait_for(self._post_many(path, bodies), timeout)
+
+    def _request(self, path, body):
+        return (
+            f"POST {path} HTTP/1.1\r\n"
+            f"Host: {self._host}\r\n"
+            "Accept: application/json\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode("latin-1") + body
+
+    async def _post_many(self, path, bodies):
+        requests = [self._request(path, body) for body in bodies]
+        results = []
+        while len(results) < len(requests):
+            pending = requests[len(results) :]
+            reused = bool(self._idle)
+            conn = self._idle.pop() if reused else await self._connect()
+            keep_alive = True
+            try:
+                conn[1].write(b"".join(pending))
+                await conn[1].drain()
+                for _ in pending:
+                    status, keep_alive, data = await self._read_response(conn[0])
+                    results.append(json.loads(data) if status == 200 else None)
+                    if not keep_alive:
+                        # Requests after this one were discarded by the
+                        # device, send them again on a new connection.
+                        break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self._close(conn)
+                # The device may have dropped an idle keep-alive connection;
+                # try once more on a fresh one before reporting the error.
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                self._close(conn)
+                raise
+            if keep_alive:
+                self._idle.append(conn)
+            else:
+                self._close(conn)
+        return results
+
+    async def _connect(self):
+        return await asyncio.open_connection(*self._addr)
+
+    @staticmethod
+    async def _read_response(reader: asyncio.StreamReader):
+        status_line = await reader.readuntil(b"\r\n")
+        if not status_line.strip():
+            raise asyncio.IncompleteReadError(status_line, None)
+        version, status = status_line.decode("latin-1").split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        keep_alive = (
+            connection != "close"
+            if version == "HTTP/1.1"
+            else connection == "keep-alive"
+        )
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            data = b""
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                data += chunk[:-2]
+        elif "content-length" in headers:
+            data = await reader.readexactly(int(headers["content-length"]))
+        else:
+            data = await reader.read()
+            keep_alive = False
+        return int(status), keep_alive, data
+
+    def _close(self, conn):
+        conn[1].close()
+
+    async def close(self):
+        """Close all idle connections."""
+        while self._idle:
+            self._close(self._idle.pop())
+
+
+class Transport(abc.ABC):
+    """Carries commands to one matrix and returns the decoded responses."""
+
+    async def send(self, cmd, timeout) -> dict | None:
+        """Send a command and return its response."""
+        return (await self.send_many([cmd], timeout))[0]
+
+    @abc.abstractmethod
+    async def send_many(self, cmds, timeout) -> list[dict | None]:
+        """Send several commands pipelined, return the responses in order."""
+
+    async def close(self) -> None:
+        """Close the connections of the transport."""
+
+
+class HTTPTransport(Transport):
+    """JSON commands POSTed to /cgi-bin/instr over keep-alive connections."""
+
+    def __init__(self, host, pool_size=2) -> None:
+        """Initialize the transport."""
+        self._pool = _HTTPConnectionPool(host, pool_size)
+
+    async def send_many(self, cmds, timeout) -> list[dict | None]:
+        return await self._pool.post_many(
+            INSTR_PATH, [json.dumps(cmd).encode("utf-8") for cmd in cmds], timeout
+        )
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+
+class TCPTransport(Transport):
+    """Control commands as ASCII lines over one persistent TCP connection.
+
+    Every command gets a reply line, so commands are pipelined by writing
+    them together and reading the replies in order. The connection is
+    opened on first use and again after it fails. Commands without an
+    ASCII form are sent through fallback.
+    """
+
+    def __init__(
+        self,
+        host,
+        port=DEFAULT_CONTROL_PORT,
+        fallback: Transport | None = None,
+    ) -> None:
+        """Initialize the transport.
+
+        host may carry the port of the web interface, which is ignored.
+        """
+        self._addr = (_split_host(host)[0], port)
+        self._fallback = fallback or HTTPTransport(host)
+        self._conn: tuple[asyncio.StreamReader, asyncio.StreamWriter] | None = None
+        # Replies are matched to commands by order, so only one batch may
+        # be on the connection at a time.
+        self._lock = asyncio.Lock()
+
+    async def send_many(self, cmds, timeout) -> list[dict | None]:
+        lines = {i: encode_ascii(cmd) for i, cmd in enumerate(cmds)}
+        ascii_ids = [i for i, line in lines.items() if line is not None]
+        other_ids = [i for i, line in lines.items() if line is None]
+
+        async def send_ascii():
+            if not ascii_ids:
+                return []
+            return await asyncio.wait_for(
+                self._send_lines([lines[i] for i in ascii_ids]), timeout
+            )
+
+        async def send_other():
+            if not other_ids:
+                return []
+            return await self._fallback.send_many(
+                [cmds[i] for i in other_ids], timeout
+            )
+
+        ascii_replies, other_resps = await asyncio.gather(send_ascii(), send_other())
+        resps: list[dict | None] = [None] * len(cmds)
+        for i, reply in zip(ascii_ids, ascii_replies):
+            if reply and not reply.lower().startswith(ASCII_ERRORS):
+                resps[i] = {"comhead": cmds[i]["comhead"], "result": 1}
+            else:
+                _LOGGER.debug(f"Control port rejected '{lines[i]}': '{reply}'")
+        for i, resp in zip(other_ids, other_resps):
+            resps[i] = resp
+        return resps
+
+    async def _send_lines(self, lines) -> list[str]:
+        async with self._lock:
+            replies = []
+            while len(replies) < len(lines):
+                pending = lines[len(replies) :]
+                reused = self._conn is not None
+                if not reused:
+                    self._conn = await asyncio.open_connection(*self._addr)
+                reader, writer = self._conn
+                try:
+                    writer.write("".join(f"{line}\r\n" for line in pending).encode())
+                    await writer.drain()
+                    for _ in pending:
+                        reply = await reader.readuntil(b"\n")
+                        replies.append(reply.decode("latin-1").strip())
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    self._drop()
+                    # The matrix may have closed an idle connection; resend
+                    # what was not answered once on a fresh one.
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    # Replies still in flight would be read by the next batch.
+                    self._drop()
+                    raise
+            return replies
+
+    def _drop(self):
+        if self._conn is not None:
+            self._conn[1].close()
+            self._conn = None
+
+    async def close(self) -> None:
+        self._drop()
+        await self._fallback.close()
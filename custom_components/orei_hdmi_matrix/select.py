@@ -0,0 +1,119 @@
+"""Scaler and EDID selects of the ports of an OREI HDMI Matrix."""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+import logging
+from typing import Any
+
+from homeassistant.components.select import SelectEntity, SelectEntityDescription
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from . import async_api as matrix_api
+from .coordinator import HDMIMatrixCoordinator
+from .entity import (
+    HDMIMatrixPortEntity,
+    HDMIMatrixPortEntityDescription,
+    async_add_port_entities,
+)
+from .orei_hdmi_matrix import (
+    EDIDModes,
+    InputState,
+    MatrixState,
+    OutputState,
+    ScalerModes,
+    edid_copy_from_output,
+    edid_mode,
+    edid_mode_name,
+    mode_name,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _edid_options(state: MatrixState) -> list[str]:
+    """Return the EDID modes, with the copy modes of outputs past the eighth."""
+    options = [mode.name for mode in EDIDModes]
+    for output in state.outputs:
+        name = edid_mode_name(edid_copy_from_output(output.output_id))
+        if name not in options:
+            options.append(name)
+    return options
+
+
+@dataclass(frozen=True, kw_only=True)
+class HDMIMatrixSelectEntityDescription(
+    SelectEntityDescription, HDMIMatrixPortEntityDescription
+):
+    """Describes a port setting select."""
+
+    options_fn: Callable[[MatrixState], list[str]]
+    # Sends the selected option to a port of a matrix.
+    select_fn: Callable[[str, int, str], Awaitable[Any]]
+
+
+SELECTS: tuple[HDMIMatrixSelectEntityDescription, ...] = (
+    HDMIMatrixSelectEntityDescription(
+        key="scaler_mode",
+        name="Scaler mode",
+        entity_category=EntityCategory.CONFIG,
+        value_fn=lambda output: mode_name(output.scaler),
+        options_fn=lambda state: [mode.name for mode in ScalerModes],
+        select_fn=lambda host, output_id, option: matrix_api.video_scaler(
+            host, output_id, ScalerModes[option]
+        ),
+    ),
+    HDMIMatrixSelectEntityDescription(
+        key="edid",
+        name="EDID",
+        inputs=True,
+        entity_category=EntityCategory.CONFIG,
+        value_fn=lambda input_state: edid_mode_name(input_state.edid),
+        options_fn=_edid_options,
+        select_fn=lambda host, input_id, option: matrix_api.set_input_edid(
+            host, input_id, edid_mode(option)
+        ),
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the port setting selects of a matrix."""
+    async_add_port_entities(entry, async_add_entities, HDMIMatrixPortSelect, SELECTS)
+
+
+class HDMIMatrixPortSelect(HDMIMatrixPortEntity, SelectEntity):
+    """Scaler mode of one output or EDID of one input."""
+
+    entity_description: HDMIMatrixSelectEntityDescription
+
+    def __init__(
+        self,
+        coordinator: HDMIMatrixCoordinator,
+        description: HDMIMatrixSelectEntityDescription,
+        port: InputState | OutputState,
+    ) -> None:
+        """Initialize the select with the options of the matrix."""
+        super().__init__(coordinator, description, port)
+        self._attr_options = description.options_fn(coordinator.state)
+
+    @property
+    def current_option(self) -> str | None:
+        """Return the selected mode."""
+        return self._value
+
+    async def async_select_option(self, option: str) -> None:
+        """Send the selected mode to the port."""
+        _LOGGER.info(
+            f"Setting {self.entity_description.key} of port {self._port_id} "
+            f"to {option}"
+        )
+        await self.entity_description.select_fn(self.host, self._port_id, option)
@@ -0,0 +1,146 @@
+"""Diagnostic sensors with the request metrics of an OREI HDMI Matrix."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import PERCENTAGE, EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from . import async_api as matrix_api
+from .coordinator import HDMIMatrixCoordinator
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HDMIMatrixSensorEntityDescription(SensorEntityDescription):
+    """Describes a metrics sensor."""
+
+    value_fn: Callable[[dict[str, Any]], StateType]
+
+
+SENSORS: tuple[HDMIMatrixSensorEntityDescription, ...] = (
+    HDMIMatrixSensorEntityDescription(
+        key="requests",
+        name="Requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m["totals"]["requests"],
+    ),
+    HDMIMatrixSensorEntityDescription(
+        key="failures",
+        name="Failed requests",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m["totals"]["failures"],
+    ),
+    HDMIMatrixSensorEntityDescription(
+        key="retries",
+        name="Retries",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m["totals"]["retries"],
+    ),
+    HDMIMatrixSensorEntityDescription(
+        key="timeouts",
+        name="Timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m["totals"]["timeouts"],
+    ),
+    HDMIMatrixSensorEntityDescription(
+        key="invalid",
+        name="Invalid responses",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda m: m["totals"]["invalid"],
+    ),
+    HDMIMatrixSensorEntityDescription(
+        key="latency_mean",
+        name="Mean request latency",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda m: _round(m["totals"]["latency"]["mean_ms"]),
+    ),
+    HDMIMatrixSensorEntityDescription(
+        key="latency_p95",
+        name="95th percentile request latency",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda m: _round(m["totals"]["latency"]["p95_ms"]),
+    ),
+    HDMIMatrixSensorEntityDescription(
+        key="wait_mean",
+        name="Mean queue wait",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda m: _round(m["wait"]["mean_ms"]),
+    ),
+    HDMIMatrixSensorEntityDescription(
+        key="cache_hit_ratio",
+        name="Cache hit ratio",
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda m: (
+            None
+            if m["totals"]["cache_hit_ratio"] is None
+            else round(m["totals"]["cache_hit_ratio"] * 100, 1)
+        ),
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the metrics sensors of a matrix."""
+    coordinator: HDMIMatrixCoordinator = entry.runtime_data
+    async_add_entities(
+        HDMIMatrixMetricSensor(coordinator, description) for description in SENSORS
+    )
+
+
+class HDMIMatrixMetricSensor(CoordinatorEntity[HDMIMatrixCoordinator], SensorEntity):
+    """Request metric of one matrix, read from the client.
+
+    The metrics are kept in memory and read again whenever the coordinator
+    polls the matrix or a command is applied, without polling of their own.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    entity_description: HDMIMatrixSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: HDMIMatrixCoordinator,
+        description: HDMIMatrixSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        host = coordinator.host
+        self._attr_unique_id = f"{host}-{description.key}"
+        self._attr_name = f"OREI HDMI Matrix {host} {description.name}"
+
+    @property
+    def available(self) -> bool:
+        """Return True, the metrics are kept while the matrix is offline."""
+        return True
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the latest metric of the matrix."""
+        return self.entity_description.value_fn(
+            matrix_api.metrics.as_dict(self.coordinator.host)
+        )
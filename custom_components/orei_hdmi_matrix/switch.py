@@ -0,0 +1,86 @@
+"""ARC and stream switches of the outputs of an OREI HDMI Matrix."""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+import logging
+from typing import Any
+
+from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from . import async_api as matrix_api
+from .entity import (
+    HDMIMatrixPortEntity,
+    HDMIMatrixPortEntityDescription,
+    async_add_port_entities,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HDMIMatrixSwitchEntityDescription(
+    SwitchEntityDescription, HDMIMatrixPortEntityDescription
+):
+    """Describes an output setting switch."""
+
+    # Sends the new state of the setting to a port of a matrix.
+    turn_fn: Callable[[str, int, bool], Awaitable[Any]]
+
+
+SWITCHES: tuple[HDMIMatrixSwitchEntityDescription, ...] = (
+    HDMIMatrixSwitchEntityDescription(
+        key="arc",
+        name="ARC",
+        entity_category=EntityCategory.CONFIG,
+        value_fn=lambda output: output.arc,
+        turn_fn=matrix_api.set_arc,
+    ),
+    HDMIMatrixSwitchEntityDescription(
+        key="stream",
+        name="Stream",
+        entity_category=EntityCategory.CONFIG,
+        value_fn=lambda output: output.stream,
+        turn_fn=matrix_api.tx_stream,
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the output setting switches of a matrix."""
+    async_add_port_entities(entry, async_add_entities, HDMIMatrixPortSwitch, SWITCHES)
+
+
+class HDMIMatrixPortSwitch(HDMIMatrixPortEntity, SwitchEntity):
+    """ARC or stream setting of one output."""
+
+    entity_description: HDMIMatrixSwitchEntityDescription
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return true if the setting is on."""
+        return self._value
+
+    async def _async_turn(self, on_state: bool) -> None:
+        _LOGGER.info(
+            f"Setting {self.entity_description.key} of output {self._port_id} "
+            f"to value {on_state}"
+        )
+        await self.entity_description.turn_fn(self.host, self._port_id, on_state)
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """Turn the setting on."""
+        await self._async_turn(True)
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """Turn the setting off."""
+        await self._async_turn(False)
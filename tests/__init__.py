@@ -0,0 +1 @@
+"""Tests of the OREI HDMI Matrix integration."""
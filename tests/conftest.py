@@ -0,0 +1,22 @@
+"""Fixtures of the OREI HDMI Matrix integration tests."""
+
+import importlib.util
+
+import pytest
+
+# The integration tests need Home Assistant, the library tests next to the
+# library do not.
+if importlib.util.find_spec("homeassistant") is None:
+    collect_ignore_glob = ["test_*.py"]
+
+
+@pytest.fixture
+def matrix_state():
+    """Return the state of a simulated 2x2 matrix."""
+    from custom_components.orei_hdmi_matrix.orei_hdmi_matrix import (
+        HDMIMatrixAPI,
+        HDMIMatrixSimulator,
+    )
+
+    with HDMIMatrixSimulator(inputs=2, outputs=2) as sim:
+        return HDMIMatrixAPI().get_state(sim.host)
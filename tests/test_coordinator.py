@@ -0,0 +1,65 @@
+"""Tests of the update coordinator of the OREI HDMI Matrix."""
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+from homeassistant.const import STATE_OFF, STATE_ON, STATE_UNKNOWN
+
+from custom_components.orei_hdmi_matrix import async_api
+from custom_components.orei_hdmi_matrix.const import (
+    ATTR_ARC,
+    ATTR_INPUT_ACTIVE,
+    ATTR_SOURCE_ID,
+)
+from custom_components.orei_hdmi_matrix.coordinator import (
+    HDMIMatrixCoordinator,
+    diff_zones,
+    zone_views,
+)
+from custom_components.orei_hdmi_matrix.orei_hdmi_matrix.commands import build
+
+
+def test_diff_zones_returns_only_changed_fields(matrix_state):
+    zones = zone_views(matrix_state)
+    # Two outputs and the All Outputs zone, which has no settings.
+    assert list(zones) == [1, 2, 3]
+    assert zones[3][ATTR_ARC] == STATE_UNKNOWN
+    assert diff_zones({}, zones) == zones
+    assert diff_zones(zones, zone_views(matrix_state)) == {}
+
+    matrix_state.output(1).arc = True
+    matrix_state.input(1).active = False
+    assert matrix_state.apply(build("video switch", 1, 2))
+    assert diff_zones(zones, zone_views(matrix_state)) == {
+        1: {ATTR_ARC: STATE_ON, ATTR_INPUT_ACTIVE: STATE_OFF},
+        2: {ATTR_SOURCE_ID: 1, ATTR_INPUT_ACTIVE: STATE_OFF},
+    }
+
+
+def test_adapt_interval(monkeypatch):
+    now = 1000.0
+    circuit_open = False
+    monkeypatch.setattr(async_api, "circuit_open", lambda host: circuit_open)
+    coordinator = SimpleNamespace(
+        host="matrix",
+        hass=SimpleNamespace(loop=SimpleNamespace(time=lambda: now)),
+        _min_interval=timedelta(seconds=5),
+        _max_interval=timedelta(seconds=60),
+        _active_until=0.0,
+        update_interval=timedelta(seconds=60),
+    )
+
+    def adapt(changed):
+        HDMIMatrixCoordinator._adapt_interval(coordinator, changed)
+        return coordinator.update_interval.total_seconds()
+
+    # Fast for a minute after a change, then backing off to the maximum.
+    assert adapt(True) == 5
+    now += 30
+    assert adapt(False) == 5
+    now += 31
+    assert [adapt(False) for _ in range(5)] == [10, 20, 40, 60, 60]
+    assert adapt(True) == 5
+    # An unreachable matrix is polled at the maximum interval.
+    circuit_open = True
+    assert adapt(True) == 60
@@ -0,0 +1,49 @@
+"""Tests of the per-port entities of the OREI HDMI Matrix."""
+
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from custom_components.orei_hdmi_matrix.binary_sensor import (
+    BINARY_SENSORS,
+    HDMIMatrixPortBinarySensor,
+)
+from custom_components.orei_hdmi_matrix.orei_hdmi_matrix import (
+    EDIDModes,
+    edid_mode_name,
+)
+from custom_components.orei_hdmi_matrix.select import SELECTS, HDMIMatrixPortSelect
+
+
+def _coordinator(state):
+    return SimpleNamespace(host="matrix", state=state, last_update_success=True)
+
+
+def test_port_entity_writes_only_changes(matrix_state):
+    coordinator = _coordinator(matrix_state)
+    entity = HDMIMatrixPortBinarySensor(
+        coordinator, BINARY_SENSORS[0], matrix_state.output(2)
+    )
+    entity.async_write_ha_state = Mock()
+    assert entity.unique_id == "matrix-connected-2"
+    assert entity.is_on
+
+    entity._handle_coordinator_update()
+    entity.async_write_ha_state.assert_not_called()
+
+    matrix_state.output(2).connected = False
+    entity._handle_coordinator_update()
+    assert entity.async_write_ha_state.call_count == 1
+    assert entity.is_on is False
+
+    coordinator.last_update_success = False
+    entity._handle_coordinator_update()
+    assert entity.async_write_ha_state.call_count == 2
+
+
+def test_edid_select(matrix_state):
+    description = next(d for d in SELECTS if d.key == "edid")
+    entity = HDMIMatrixPortSelect(
+        _coordinator(matrix_state), description, matrix_state.input(1)
+    )
+    assert entity.options == [mode.name for mode in EDIDModes]
+    assert entity.current_option == edid_mode_name(matrix_state.input(1).edid)
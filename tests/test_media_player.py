@@ -0,0 +1,40 @@
+"""Tests of the zone services of the OREI HDMI Matrix."""
+
+from types import SimpleNamespace
+
+import pytest
+import voluptuous as vol
+
+from custom_components.orei_hdmi_matrix.const import ATTR_ROUTING, DATA_HDMIMATRIX
+from custom_components.orei_hdmi_matrix.media_player import (
+    SERVICE_SET_ROUTING_SCHEMA,
+    _target_entity_ids,
+    _zones_by_host,
+)
+
+
+def _hass(*zones):
+    index = {zone.entity_id: zone for zone in zones}
+    return SimpleNamespace(data={DATA_HDMIMATRIX: index})
+
+
+def test_set_routing_requires_routes():
+    with pytest.raises(vol.Invalid):
+        SERVICE_SET_ROUTING_SCHEMA({ATTR_ROUTING: {}})
+    data = SERVICE_SET_ROUTING_SCHEMA({ATTR_ROUTING: {"media_player.tv": "PC"}})
+    assert _target_entity_ids(data) == ["media_player.tv"]
+
+
+def test_set_routing_targets_only_routed_zones():
+    tv = SimpleNamespace(entity_id="media_player.tv", host="a")
+    projector = SimpleNamespace(entity_id="media_player.projector", host="a")
+    other = SimpleNamespace(entity_id="media_player.bar", host="b")
+    hass = _hass(tv, projector, other)
+
+    entity_ids = _target_entity_ids({ATTR_ROUTING: {"media_player.tv": "PC"}})
+    assert _zones_by_host(hass, entity_ids) == {"a": [tv]}
+    # Without a target all zones are, grouped by matrix.
+    assert _zones_by_host(hass, _target_entity_ids({})) == {
+        "a": [tv, projector],
+        "b": [other],
+    }